@@ -7,7 +7,7 @@ import os
 # Adiciona o caminho da raiz do projeto para que as páginas consigam importar o módulo de funções
 sys.path.insert(0, os.path.dirname(__file__))
 
-from shared_funcs import check_admin_auth
+from shared_funcs import check_admin_auth, render_api_metrics_panel
 
 st.set_page_config(layout="wide", page_title="Painel de Gestão Tri7 AI")
 
@@ -16,8 +16,8 @@ st.session_state.setdefault('is_authenticated', False)
 st.session_state.setdefault('api_key', "")
 st.session_state.setdefault('new_api_key_info', None)
 st.session_state.setdefault('confirm_action', None)
-st.session_state.setdefault('last_perm_account_id', None) 
-st.session_state.setdefault('billing_report_data', None)
+st.session_state.setdefault('billing_report_job', None)
+st.session_state.setdefault('bulk_import_results', None)
 
 # --- TELA DE LOGIN / PROTEÇÃO ---
 if not st.session_state.is_authenticated:
@@ -46,5 +46,4 @@ st.sidebar.button("Sair (Logout)", on_click=logout, use_container_width=True)
 st.sidebar.header("Módulos")
 st.markdown("Selecione um módulo na barra lateral para começar.")
 
-
-
+render_api_metrics_panel()
@@ -0,0 +1,189 @@
+# api_metrics.py (MÉTRICAS DAS CHAMADAS À API: LATÊNCIA, STATUS, TAMANHO, RETENTATIVAS E CACHE)
+#
+# AdminApiClient.request registra cada chamada HTTP e o ApiCache registra cada consulta ao cache.
+# Os registros vão para o agregado do processo e, quando há uma sessão do Streamlit associada,
+# também para o agregado da sessão (st.session_state['api_metrics']), que alimenta o painel lateral.
+# Threads de trabalho só herdam a sessão quando a tarefa é embrulhada com propagate().
+
+import re
+import json
+import time
+import threading
+import contextvars
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+# --- CONFIGURAÇÃO ---
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # Limites superiores do histograma
+RECENT_CALLS_PROCESS = 1_000  # Últimas chamadas guardadas no agregado do processo
+RECENT_CALLS_SESSION = 300  # Últimas chamadas guardadas por sessão
+SESSION_STATE_KEY = 'api_metrics'
+PROMETHEUS_PREFIX = 'tri7_api'
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+def endpoint_template(path: str) -> str:
+    """Caminho sem a query e com os IDs trocados por {id}, para agrupar '/admin/accounts/12/users/' e '/admin/accounts/13/users/'."""
+    return _ID_SEGMENT.sub('/{id}', path.split('?', 1)[0])
+
+class Histogram:
+    """Histograma de latência com limites fixos (LATENCY_BUCKETS_MS), contagem e soma."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # Último balde = acima do maior limite
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, latency_ms: float):
+        i = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound), len(LATENCY_BUCKETS_MS))
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Limite superior do balde que contém o quantil q (aproximação típica de histograma)."""
+        if not self.count: return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target: return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'buckets_ms': list(LATENCY_BUCKETS_MS), 'counts': list(self.counts), 'count': self.count, 'sum_ms': round(self.total_ms, 3)}
+
+class ApiMetrics:
+    """Agregado das chamadas: histograma por (método, endpoint), contadores de status, bytes, retentativas e cache."""
+
+    def __init__(self, recent_calls: int):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.recent: "deque[Dict[str, Any]]" = deque(maxlen=recent_calls)
+        self.rerun_calls: "deque[Dict[str, Any]]" = deque(maxlen=recent_calls)  # Chamadas desde o último painel exibido (só nas sessões)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.statuses: Dict[Tuple[str, str, str], int] = {}
+        self.bytes: Dict[Tuple[str, str], int] = {}
+        self.retries: Dict[Tuple[str, str], int] = {}
+        self.cache: Dict[Tuple[str, str], int] = {}
+
+    def add(self, record: Dict[str, Any], keep_for_rerun: bool = False):
+        with self._lock:
+            self.recent.append(record)
+            if keep_for_rerun: self.rerun_calls.append(record)
+            if record['kind'] == 'cache':
+                key = (record['function'], record['cache'])
+                self.cache[key] = self.cache.get(key, 0) + 1
+                return
+            key = (record['method'], record['endpoint'])
+            self.latency.setdefault(key, Histogram()).observe(record['latency_ms'])
+            status_key = (*key, str(record['status'] or 'error'))
+            self.statuses[status_key] = self.statuses.get(status_key, 0) + 1
+            self.bytes[key] = self.bytes.get(key, 0) + record['bytes']
+            self.retries[key] = self.retries.get(key, 0) + record['retries']
+
+    def drain_rerun(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            calls = list(self.rerun_calls)
+            self.rerun_calls.clear()
+        return calls
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Uma linha por (método, endpoint): chamadas, erros, latência média/p50/p95, bytes e retentativas."""
+        with self._lock:
+            rows = []
+            for (method, endpoint), hist in sorted(self.latency.items(), key=lambda item: -item[1].total_ms):
+                errors = sum(n for (m, e, status), n in self.statuses.items() if (m, e) == (method, endpoint) and not status.startswith(('2', '3')))
+                rows.append({'method': method, 'endpoint': endpoint, 'calls': hist.count, 'errors': errors,
+                             'avg_ms': round(hist.total_ms / hist.count, 1), 'p50_ms': hist.quantile(0.5), 'p95_ms': hist.quantile(0.95),
+                             'bytes': self.bytes.get((method, endpoint), 0), 'retries': self.retries.get((method, endpoint), 0)})
+            return rows
+
+    def cache_summary(self) -> List[Dict[str, Any]]:
+        """Consultas ao cache por função e resultado (hit, stale, wait, miss, fallback)."""
+        with self._lock:
+            functions = sorted({function for function, _ in self.cache})
+            return [{'function': function, **{result: self.cache.get((function, result), 0) for result in ('hit', 'stale', 'wait', 'miss', 'fallback')}} for function in functions]
+
+    def to_json(self) -> str:
+        with self._lock:
+            data = {
+                'started_at': self.started_at,
+                'latency': [{'method': m, 'endpoint': e, **hist.to_dict()} for (m, e), hist in self.latency.items()],
+                'statuses': [{'method': m, 'endpoint': e, 'status': s, 'count': n} for (m, e, s), n in self.statuses.items()],
+                'bytes': [{'method': m, 'endpoint': e, 'bytes': n} for (m, e), n in self.bytes.items()],
+                'retries': [{'method': m, 'endpoint': e, 'retries': n} for (m, e), n in self.retries.items()],
+                'cache': [{'function': f, 'result': r, 'count': n} for (f, r), n in self.cache.items()],
+                'recent_calls': list(self.recent),
+            }
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Formato de exposição de texto do Prometheus (histograma de latência em segundos e contadores)."""
+        def labels(**values) -> str:
+            return '{' + ','.join(f'{k}="{str(v)}"' for k, v in values.items()) + '}'
+        p = PROMETHEUS_PREFIX
+        lines = [f'# HELP {p}_request_duration_seconds Latência das chamadas HTTP ao gateway.', f'# TYPE {p}_request_duration_seconds histogram']
+        with self._lock:
+            for (method, endpoint), hist in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS_MS + (float('inf'),), hist.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else f'{bound / 1000:g}'
+                    lines.append(f'{p}_request_duration_seconds_bucket{labels(method=method, endpoint=endpoint, le=le)} {cumulative}')
+                lines.append(f'{p}_request_duration_seconds_sum{labels(method=method, endpoint=endpoint)} {hist.total_ms / 1000:.6f}')
+                lines.append(f'{p}_request_duration_seconds_count{labels(method=method, endpoint=endpoint)} {hist.count}')
+            lines += [f'# HELP {p}_requests_total Chamadas HTTP por status.', f'# TYPE {p}_requests_total counter']
+            lines += [f'{p}_requests_total{labels(method=m, endpoint=e, status=s)} {n}' for (m, e, s), n in sorted(self.statuses.items())]
+            lines += [f'# HELP {p}_response_bytes_total Bytes recebidos nas respostas.', f'# TYPE {p}_response_bytes_total counter']
+            lines += [f'{p}_response_bytes_total{labels(method=m, endpoint=e)} {n}' for (m, e), n in sorted(self.bytes.items())]
+            lines += [f'# HELP {p}_retries_total Retentativas automáticas (429/5xx) das chamadas.', f'# TYPE {p}_retries_total counter']
+            lines += [f'{p}_retries_total{labels(method=m, endpoint=e)} {n}' for (m, e), n in sorted(self.retries.items())]
+            lines += [f'# HELP {p}_cache_lookups_total Consultas ao cache de leituras por resultado.', f'# TYPE {p}_cache_lookups_total counter']
+            lines += [f'{p}_cache_lookups_total{labels(function=f, result=r)} {n}' for (f, r), n in sorted(self.cache.items())]
+        return '\n'.join(lines) + '\n'
+
+process_metrics = ApiMetrics(RECENT_CALLS_PROCESS)
+_session_metrics: contextvars.ContextVar[Optional[ApiMetrics]] = contextvars.ContextVar('session_metrics', default=None)
+_api_function: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('api_function', default=None)
+
+def session_metrics() -> Optional[ApiMetrics]:
+    """Agregado da sessão atual: o herdado via propagate() ou, na thread do script, o do st.session_state."""
+    metrics = _session_metrics.get()
+    if metrics is not None: return metrics
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx(suppress_warning=True) is None: return None
+        import streamlit as st
+        if SESSION_STATE_KEY not in st.session_state: st.session_state[SESSION_STATE_KEY] = ApiMetrics(RECENT_CALLS_SESSION)
+        return st.session_state[SESSION_STATE_KEY]
+    except Exception:
+        return None  # Fora do Streamlit (scripts, benchmarks): só o agregado do processo
+
+def propagate(fn: Callable) -> Callable:
+    """Embrulha uma tarefa para rodar numa thread registrando as chamadas na sessão de quem a criou."""
+    metrics, function = session_metrics(), _api_function.get()
+    def run(*args, **kwargs):
+        tokens = _session_metrics.set(metrics), _api_function.set(function)
+        try: return fn(*args, **kwargs)
+        finally: _session_metrics.reset(tokens[0]); _api_function.reset(tokens[1])
+    return run
+
+def in_function(name: str, fn: Callable, *args, **kwargs) -> Any:
+    """Executa fn com `name` como função de API corrente (aparece nos registros das chamadas HTTP)."""
+    token = _api_function.set(name)
+    try: return fn(*args, **kwargs)
+    finally: _api_function.reset(token)
+
+def _add(record: Dict[str, Any]):
+    process_metrics.add(record)
+    metrics = session_metrics()
+    if metrics is not None: metrics.add(record, keep_for_rerun=True)
+
+def record_http(method: str, path: str, status: Optional[int], latency_ms: float, size: int, retries: int):
+    _add({'kind': 'http', 'at': time.time(), 'function': _api_function.get(), 'method': method, 'endpoint': endpoint_template(path),
+          'status': status, 'latency_ms': round(latency_ms, 2), 'bytes': size, 'retries': retries, 'cache': None})
+
+def record_cache(function: str, result: str, latency_ms: float):
+    """result: 'hit' (valor fresco), 'stale' (vencido, revalidando em segundo plano), 'wait' (esperou outra busca), 'miss'
+    ou 'fallback' (a busca falhou por causa do gateway e o último valor bom foi devolvido)."""
+    _add({'kind': 'cache', 'at': time.time(), 'function': function, 'method': None, 'endpoint': None,
+          'status': None, 'latency_ms': round(latency_ms, 2), 'bytes': 0, 'retries': 0, 'cache': result})
@@ -0,0 +1,101 @@
+# benchmarks/bench_export.py (PICO DE MEMÓRIA E TEMPO DA EXPORTAÇÃO DO RELATÓRIO DETALHADO)
+#
+# Uso: python benchmarks/bench_export.py [--rows 1000000] [--formats legacy_xlsx xlsx csv parquet]
+#
+# Cada formato roda num subprocesso próprio. Depois de montar a tabela sintética o pico de RSS
+# do processo é zerado (Linux: /proc/self/clear_refs), então "peak_rss_mb" é o pico durante a
+# exportação e "export_mb" é o quanto ela somou ao RSS que já existia com a tabela carregada.
+
+import os
+import sys
+import io
+import json
+import time
+import resource
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def build_jobs_frame(rows: int) -> pd.DataFrame:
+    """Tabela de jobs sintética no mesmo formato compacto de billing_analytics.load_jobs_frame."""
+    rng = np.random.default_rng(42)
+    created = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 86400, rows)), unit='s')
+    category = lambda names, count: pd.Categorical.from_codes(rng.integers(0, count, rows), categories=[names.format(i) for i in range(count)])
+    return pd.DataFrame({
+        'created_at': created,
+        'account_name': category("Cartório de Registro {:04d}", 2000),
+        'user_name': category("Usuário {:05d}", 20000),
+        'job_id': np.arange(rows, dtype='int64'),
+        'prompt_name': category("Prompt {:03d}", 150),
+        'model_display_name': pd.Categorical(rng.choice(['gemini-2.5-flash-lite', 'gemini-2.5-flash', 'gemini-2.5-pro'], rows)),
+        'total_tokens': rng.integers(100, 200_000, rows),
+        'cost_e8': rng.integers(0, 1_000_000, rows),
+        'day': created.normalize(),
+    })
+
+def legacy_xlsx(df: pd.DataFrame, path: str):
+    """Exportação anterior do dashboard (BytesIO + to_excel + astype(str) + strftime), para comparação."""
+    df = df.drop(columns=['day']).rename(columns={'created_at': 'Data', 'cost_e8': 'Custo (R$)'})
+    df['Data'] = df['Data'].dt.strftime('%d/%m/%Y %H:%M:%S')
+    df['Custo (R$)'] = (df['Custo (R$)'] / 10**8).astype(float).round(8)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='RelatorioFaturamento')
+        worksheet = writer.sheets['RelatorioFaturamento']
+        for i, col in enumerate(df.columns):
+            worksheet.set_column(i, i, max(df[col].astype(str).str.len().max(), len(col)) + 2)
+    with open(path, 'wb') as f: f.write(output.getvalue())
+
+def _rss_mb(field: str) -> float:
+    """VmRSS (atual) ou VmHWM (pico) do processo em MiB; fora do Linux cai no ru_maxrss."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'): return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f: f.write('5')
+    except OSError:
+        pass
+
+def run_child(fmt: str, rows: int) -> dict:
+    from billing_export import EXPORT_FORMATS
+    df = build_jobs_frame(rows)
+    frame_mb = df.memory_usage(deep=True).sum() / 2**20
+    _reset_peak_rss()
+    before_mb = _rss_mb('VmRSS')
+    writer = legacy_xlsx if fmt == 'legacy_xlsx' else EXPORT_FORMATS[fmt][0]
+    path = f"/tmp/bench_export_{os.getpid()}.{fmt.split('_')[-1]}"
+    start = time.perf_counter()
+    writer(df, path)
+    seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / 2**20
+    os.remove(path)
+    peak_mb = _rss_mb('VmHWM')
+    return {'format': fmt, 'rows': rows, 'seconds': round(seconds, 2), 'frame_mb': round(frame_mb, 1),
+            'peak_rss_mb': round(peak_mb, 1), 'export_mb': round(peak_mb - before_mb, 1), 'file_mb': round(size_mb, 1)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--formats', nargs='+', default=['legacy_xlsx', 'xlsx', 'csv', 'parquet'])
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_child(args.child, args.rows))); return
+    results = []
+    for fmt in args.formats:
+        out = subprocess.run([sys.executable, __file__, '--child', fmt, '--rows', str(args.rows)], capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        print(json.dumps(results[-1]), file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# benchmarks/bench_pages.py (TEMPO, CHAMADAS À API E PICO DE MEMÓRIA DOS CAMINHOS QUENTES DO PAINEL)
+#
+# Uso: python benchmarks/bench_pages.py [--scenarios imports login login:no_head pages report export] [--jobs 10000 100000 1000000]
+#                                       [--accounts 500] [--latency-ms 10] [--jitter-ms 0] [--error-rate 0]
+#                                       [--output benchmarks/baseline.json] [--compare benchmarks/baseline.json]
+#
+# Cada cenário roda num subprocesso próprio, com o seu gateway de mentira (stub_gateway.py) noutro
+# subprocesso, e dirige os scripts das páginas com o AppTest do Streamlit. Para cada cenário são
+# registrados o tempo de parede, as chamadas HTTP e consultas ao cache (api_metrics, lado do painel)
+# e o pico de RSS do painel durante a etapa medida (zerado antes dela, como em bench_export.py).
+# O cenário 'imports' mede, com python -X importtime, o import frio do que o login e o dashboard
+# carregam antes de haver relatório, e se pandas/xlsxwriter entraram nesse caminho.
+# 'login' mede a validação da chave e a primeira página logo depois (a lista de contas deve ser
+# baixada uma vez só); 'login:no_head' faz o mesmo contra um gateway que recusa HEAD.
+# --compare aponta os cenários mais lentos que a linha de base além de --tolerance.
+
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import argparse
+import subprocess
+from typing import List, Dict, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_export import _rss_mb, _reset_peak_rss
+
+ADMIN_KEY = 'bench-key'
+PAGES = {
+    'contas': '01_Gerenciar_Contas_e_Usuario.py',
+    'prompts': '02_Gerenciar_Prompts.py',
+    'permissoes': '03_Gerenciar_Permissoes.py',
+    'faturamento': '04_Dashboard_Faturamento.py',
+    'busca_usuarios': '05_Buscar_Usuarios.py',
+}
+# Cenário 'imports': módulos importados por cada ponto de entrada antes de qualquer tabela/exportação
+IMPORT_TARGETS = {
+    'login': 'import streamlit, shared_funcs',
+    'faturamento': 'import streamlit, shared_funcs, directory, report_jobs',
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'xlsxwriter', 'openpyxl')
+IMPORT_RUNS = 5  # Mediana de N processos, para diminuir o ruído
+REPORT_DAYS = 31  # Período padrão do formulário do dashboard (hoje - 30 dias até hoje)
+APP_TIMEOUT = 1_800
+
+def start_stub(args, jobs_per_day: int, head_supported: bool = True) -> Tuple[subprocess.Popen, str]:
+    """Sobe o gateway de mentira num subprocesso e devolve (processo, URL base)."""
+    stub = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'stub_gateway.py'), '--port', '0', '--admin-key', ADMIN_KEY,
+         '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms), '--error-rate', str(args.error_rate),
+         '--accounts', str(args.accounts), '--jobs-per-day', str(jobs_per_day)] + ([] if head_supported else ['--no-head']),
+        stdout=subprocess.PIPE, text=True)
+    url = re.search(r'http://\S+', stub.stdout.readline()).group(0)
+    return stub, url
+
+def _app(page: Optional[str] = None):
+    from streamlit.testing.v1 import AppTest
+    if page is None: return AppTest.from_file(os.path.join(ROOT_DIR, 'Painel_Tri7.py'), default_timeout=APP_TIMEOUT)
+    at = AppTest.from_file(os.path.join(ROOT_DIR, 'pages', page), default_timeout=APP_TIMEOUT)
+    defaults = dict(is_authenticated=True, api_key=ADMIN_KEY, new_api_key_info=None, confirm_action=None,
+                    billing_report_job=None, bulk_import_results=None)
+    for key, value in defaults.items(): at.session_state[key] = value
+    return at
+
+def _button(at, label: str):
+    return next(button for button in at.button if button.label == label)
+
+def _wait_job(at, done) -> None:
+    """Espera o relatório em segundo plano (report_jobs) da sessão chegar a done(job) e roda a página de novo."""
+    from report_jobs import report_executor
+    job = report_executor.get(at.session_state['billing_report_job'], ADMIN_KEY)
+    while not done(job): time.sleep(0.05)
+    at.run()
+
+def _check(at):
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    if errors: raise RuntimeError(f"O script falhou: {errors}")
+
+def measure_imports(code: str) -> Dict[str, float]:
+    """Tempo de import (mediana de IMPORT_RUNS processos novos, via -X importtime) e módulos pesados carregados."""
+    totals, loaded = [], set()
+    for _ in range(IMPORT_RUNS):
+        out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        total = 0
+        for line in out.stderr.splitlines():
+            match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)', line)
+            if not match: continue
+            if not match[3]: total += int(match[2])  # Só os imports de nível superior (o cumulativo já inclui os filhos)
+            if match[4] in HEAVY_MODULES: loaded.add(match[4])
+        totals.append(total)
+    totals.sort()
+    return {'seconds': round(totals[len(totals) // 2] / 1e6, 3), 'heavy_modules': sorted(loaded)}
+
+def measure(step) -> Dict[str, float]:
+    """Roda step() com as métricas da API zeradas e o pico de RSS reiniciado; devolve tempo, chamadas e memória."""
+    import api_metrics
+    api_metrics.process_metrics = api_metrics.ApiMetrics(api_metrics.RECENT_CALLS_PROCESS)
+    _reset_peak_rss()
+    before_mb = _rss_mb('VmRSS')
+    start = time.perf_counter()
+    step()
+    seconds = time.perf_counter() - start
+    peak_mb = _rss_mb('VmHWM')
+    summary = api_metrics.process_metrics.summary()
+    cache = api_metrics.process_metrics.cache_summary()
+    return {
+        'seconds': round(seconds, 3),
+        'http_calls': sum(row['calls'] for row in summary),
+        'http_errors': sum(row['errors'] for row in summary),
+        'http_retries': sum(row['retries'] for row in summary),
+        'response_mb': round(sum(row['bytes'] for row in summary) / 2**20, 2),
+        'cache_hits': sum(row['hit'] + row['stale'] for row in cache),
+        'cache_misses': sum(row['miss'] + row['wait'] for row in cache),
+        'peak_rss_mb': round(peak_mb, 1),
+        'added_rss_mb': round(peak_mb - before_mb, 1),
+    }
+
+def run_child(scenario: str, args) -> List[dict]:
+    kind, _, param = scenario.partition(':')
+    if kind == 'imports': return [{'scenario': f'imports:{name}', **measure_imports(code)} for name, code in IMPORT_TARGETS.items()]
+    jobs = int(param) if kind in ('report', 'export') else 0
+    stub, url = start_stub(args, jobs_per_day=max(1, -(-jobs // REPORT_DAYS)) if jobs else 10, head_supported=param != 'no_head')
+    os.environ['TRI7_API_BASE_URL'] = url
+    os.environ['TRI7_BILLING_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='bench_pages_'), 'billing.sqlite3')
+    results = []
+    try:
+        import shared_funcs  # noqa: F401  (importado antes das medições para não contar o tempo de import)
+        if kind == 'login':
+            at = _app()
+            at.run()
+            at.text_input(key='login_api_key').input(ADMIN_KEY)
+            results.append({'scenario': scenario, **measure(lambda: _button(at, 'Entrar').click().run())})
+            _check(at)
+            if not at.session_state['is_authenticated']: raise RuntimeError("Login falhou")
+            first_page = _app(PAGES['contas'])
+            results.append({'scenario': f'{scenario}:first_page', **measure(first_page.run)})
+            _check(first_page)
+        elif kind == 'page':
+            at = _app(PAGES[param])
+            results.append({'scenario': f'page:{param}:cold', **measure(at.run)})
+            _check(at)
+            results.append({'scenario': f'page:{param}:rerun', **measure(at.run)})
+            _check(at)
+        elif kind in ('report', 'export'):
+            at = _app(PAGES['faturamento'])
+            at.run()
+            from report_jobs import report_executor, ACTIVE_STATUSES
+            def generate():
+                _button(at, 'Gerar Relatório').click().run()
+                _wait_job(at, lambda job: job.status not in ACTIVE_STATUSES)
+            report = measure(generate)
+            _check(at)
+            job = report_executor.get(at.session_state['billing_report_job'], ADMIN_KEY)
+            rows = len(job.result['jobs_df'])
+            if kind == 'report':
+                results.append({'scenario': scenario, 'rows': rows, **report})
+                # Rerun com o relatório pronto (tendências e detalhamento a partir do consolidado diário)
+                results.append({'scenario': f'{scenario}:rerun', 'rows': rows, **measure(at.run)})
+                _check(at)
+            else:
+                def export():
+                    next(radio for radio in at.radio if radio.label == "Formato do arquivo:").set_value('xlsx')
+                    _button(at, 'Preparar arquivo para download').click().run()
+                    _wait_job(at, lambda job: job.exports['xlsx']['status'] != 'running')
+                results.append({'scenario': scenario, 'rows': rows, **measure(export)})
+                _check(at)
+                results[-1]['file_mb'] = round(os.path.getsize(job.exports['xlsx']['path']) / 2**20, 1)
+                report_executor.discard(job)
+    finally:
+        stub.terminate()
+        stub.wait()
+    return results
+
+def expand_scenarios(names: List[str], jobs: List[int]) -> List[str]:
+    scenarios = []
+    for name in names:
+        if name == 'pages': scenarios += [f'page:{page}' for page in PAGES]
+        elif name in ('report', 'export'): scenarios += [f'{name}:{n}' for n in jobs]
+        else: scenarios.append(name)
+    return scenarios
+
+def compare(results: List[dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Imprime (stderr) os cenários mais lentos ou com mais chamadas que a linha de base."""
+    with open(baseline_path) as f: baseline = {row['scenario']: row for row in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        base = baseline.get(row['scenario'])
+        if not base: continue
+        if row['seconds'] > base['seconds'] * (1 + tolerance):
+            regressions.append(f"{row['scenario']}: {base['seconds']}s -> {row['seconds']}s")
+        if row.get('http_calls', 0) > base.get('http_calls', 0):
+            regressions.append(f"{row['scenario']}: {base['http_calls']} -> {row['http_calls']} chamadas HTTP")
+        new_modules = sorted(set(row.get('heavy_modules', ())) - set(base.get('heavy_modules', ())))
+        if new_modules: regressions.append(f"{row['scenario']}: passou a importar {', '.join(new_modules)}")
+    print("Regressões:\n  " + "\n  ".join(regressions) if regressions else "Sem regressões em relação à linha de base.", file=sys.stderr)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', nargs='+', default=['imports', 'login', 'login:no_head', 'pages', 'report', 'export'])
+    parser.add_argument('--jobs', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--accounts', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=10)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help="Grava os resultados (JSON) neste arquivo")
+    parser.add_argument('--compare', help="Linha de base (JSON de --output) para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Folga de tempo antes de apontar regressão (0.2 = 20%%)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_child(args.child, args))); return
+
+    config = {key: getattr(args, key) for key in ('accounts', 'latency_ms', 'jitter_ms', 'error_rate')}
+    results = []
+    for scenario in expand_scenarios(args.scenarios, args.jobs):
+        command = [sys.executable, __file__, '--child', scenario, '--accounts', str(args.accounts), '--latency-ms', str(args.latency_ms),
+                   '--jitter-ms', str(args.jitter_ms), '--error-rate', str(args.error_rate)]
+        out = subprocess.run(command, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"{scenario}: falhou\n{out.stderr[-2000:]}", file=sys.stderr); continue
+        for row in json.loads(out.stdout.strip().splitlines()[-1]):
+            results.append(row)
+            print(json.dumps(row), file=sys.stderr)
+    report = {'config': config, 'python': sys.version.split()[0], 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    if args.compare and compare(results, args.compare, args.tolerance): sys.exit(1)
+
+if __name__ == '__main__':
+    main()
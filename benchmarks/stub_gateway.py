@@ -0,0 +1,261 @@
+# benchmarks/stub_gateway.py (GATEWAY LOCAL DE MENTIRA PARA TESTES E BENCHMARKS DO PAINEL)
+#
+# Implementa, em memória, os endpoints usados em shared_funcs.py. As respostas GET levam
+# ETag e respeitam If-None-Match (304 sem corpo), como a revalidação do AdminApiClient espera.
+# HEAD responde como o GET, só sem o corpo (--no-head devolve 405, como um gateway que não o
+# implementa), e /admin/whoami é o endpoint mínimo para validar a chave no login.
+# Latência (fixa + variação), taxa de erros (503) e o volume dos dados são configuráveis.
+#
+# Uso: python benchmarks/stub_gateway.py [--port 8787] [--admin-key dev-key] [--latency-ms 0] [--jitter-ms 0]
+#                                        [--error-rate 0] [--accounts 20] [--users-per-account 3]
+#                                        [--prompts 8] [--prompt-chars 2000] [--jobs-per-day 10] [--no-head]
+#                                        [--no-prompt-get]
+#      TRI7_API_BASE_URL=http://127.0.0.1:8787 streamlit run Painel_Tri7.py
+
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Any, Optional, Tuple
+
+MODELS = ['gemini-2.5-flash-lite', 'gemini-2.5-flash', 'gemini-2.5-pro']
+# Como no gateway real: os jobs trazem o nome de exibição e o resumo (/billing/report/) o nome técnico
+MODEL_DISPLAY_NAMES = {'gemini-2.5-flash-lite': "Modelo Ultra", 'gemini-2.5-flash': "Modelo Fast", 'gemini-2.5-pro': "Modelo Pro"}
+MODEL_TECHNICAL_NAMES = {display: model for model, display in MODEL_DISPLAY_NAMES.items()}
+
+class StubState:
+    """Dados do gateway de mentira: contas, usuários, prompts, permissões e jobs sintéticos por dia."""
+
+    def __init__(self, accounts: int = 20, users_per_account: int = 3, prompts: int = 8, prompt_chars: int = 2_000, jobs_per_day: int = 10):
+        self.lock = threading.Lock()
+        self.next_id = 100_000
+        self.jobs_per_day = jobs_per_day
+        self.accounts = [{"id": i, "name": f"Cartório {i:04d}", "is_active": i % 10 != 0, "cidade": "São Paulo", "uf": "SP",
+                          "cod_tri7": 1000 + i, "created_at": "2024-01-01T00:00:00"} for i in range(1, accounts + 1)]
+        self.users = {a["id"]: [{"id": a["id"] * 1000 + k, "full_name": f"Usuário {a['id']}-{k}", "email": f"user{a['id']}.{k}@cartorio.com.br",
+                                 "is_active": True, "account_id": a["id"]} for k in range(users_per_account)] for a in self.accounts}
+        self.prompts = [{"id": i, "name": f"Prompt {i:03d}", "prompt_text": f"Prompt {i}: " + "x" * prompt_chars} for i in range(1, prompts + 1)]
+        self.permissions = {a["id"]: [p["id"] for p in self.prompts[:2]] for a in self.accounts}
+
+    def new_id(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def jobs(self, start: date, end: date, account_id: Optional[int]) -> List[Dict[str, Any]]:
+        accounts = [a for a in self.accounts if account_id is None or a["id"] == account_id]
+        jobs, day = [], start
+        while day <= end:
+            for k in range(self.jobs_per_day):
+                account = accounts[(day.toordinal() + k) % len(accounts)] if accounts else {"id": account_id, "name": "?"}
+                jobs.append({
+                    "job_id": f"{day:%Y%m%d}-{account['id']}-{k}",
+                    "created_at": f"{day}T{k % 24:02d}:{k % 60:02d}:00",
+                    "account_name": account["name"],
+                    "user_name": f"Usuário {account['id']}-{k % 3}",
+                    "prompt_name": f"Prompt {k % 8 + 1:03d}",
+                    "model_display_name": MODEL_DISPLAY_NAMES[MODELS[k % len(MODELS)]],
+                    "cost_brl": f"{(k % 97 + 1) / 10_000:.8f}",
+                    "total_tokens": 1_000 + k * 37,
+                })
+            day += timedelta(days=1)
+        return jobs
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como o gateway real
+    server: "StubGateway"
+
+    def log_message(self, *args): pass
+
+    def _send(self, status: int, payload: Any = None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.command in ("GET", "HEAD") and status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if self.command in ("GET", "HEAD") and status in (200, 304): self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command == "HEAD": body = b""  # Cabeçalhos (inclusive o Content-Length) iguais aos do GET, sem o corpo
+        self.wfile.write(body)
+        self.server.record(self.command, self.path, status, len(body))
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _route(self) -> Tuple[str, Dict[str, List[str]]]:
+        url = urlparse(self.path)
+        return url.path, parse_qs(url.query)
+
+    def _authorized(self) -> bool:
+        """Aplica a latência e os erros simulados e confere a chave; False quando a resposta já foi enviada."""
+        fail = self.server.simulate()
+        self.body = self._body() if self.command in ("POST", "PUT") else None  # Lido sempre, para manter a conexão utilizável
+        if fail: self._send(self.server.error_status, {"detail": "Erro simulado pelo gateway de mentira."}); return False
+        if self.headers.get("x-api-key") == self.server.admin_key: return True
+        self._send(403, {"detail": "Chave de API inválida."})
+        return False
+
+    def do_GET(self):
+        if not self._authorized(): return
+        path, query = self._route()
+        state = self.server.state
+        with state.lock:
+            if path == "/admin/whoami": return self._send(200, {"role": "admin"})
+            if path == "/admin/accounts/": return self._send(200, state.accounts)
+            if path == "/admin/prompts/": return self._send(200, state.prompts)
+            if m := re.fullmatch(r"/admin/prompts/(\d+)", path):
+                if not self.server.prompt_get_supported: return self._send(405, {"detail": "Method Not Allowed"})
+                prompt = next((p for p in state.prompts if p["id"] == int(m[1])), None)
+                return self._send(200, prompt) if prompt else self._send(404, {"detail": "Prompt não encontrado."})
+            if m := re.fullmatch(r"/admin/accounts/(\d+)/users/", path): return self._send(200, state.users.get(int(m[1]), []))
+            if m := re.fullmatch(r"/admin/accounts/(\d+)/permissions", path): return self._send(200, {"prompt_ids": state.permissions.get(int(m[1]), [])})
+        if path in ("/billing/detailed-report/", "/billing/report/"):
+            start, end = date.fromisoformat(query["start_date"][0]), date.fromisoformat(query["end_date"][0])
+            account_id = int(query["account_id"][0]) if "account_id" in query else None
+            jobs = state.jobs(start, end, account_id)
+            if path == "/billing/detailed-report/": return self._send(200, jobs)
+            by_model = Counter(MODEL_TECHNICAL_NAMES[job["model_display_name"]] for job in jobs)
+            tokens = Counter()
+            for job in jobs: tokens[MODEL_TECHNICAL_NAMES[job["model_display_name"]]] += job["total_tokens"]
+            return self._send(200, {
+                "period": {"start": str(start), "end": str(end)},
+                "summary": {"total_jobs": len(jobs), "total_tokens": sum(tokens.values())},
+                "by_model": [{"model": model, "total_jobs": count, "total_tokens": tokens[model]} for model, count in sorted(by_model.items())],
+            })
+        self._send(404, {"detail": "Not Found"})
+
+    def do_HEAD(self):
+        if not self.server.head_supported:
+            self.server.simulate()
+            return self._send(405, {"detail": "Method Not Allowed"})
+        self.do_GET()
+
+    def do_POST(self):
+        if not self._authorized(): return
+        path, _ = self._route()
+        body, state = self.body, self.server.state
+        with state.lock:
+            if path == "/admin/accounts/":
+                account = {"id": state.new_id(), "is_active": True, "cidade": None, "uf": None, "cod_tri7": None, "created_at": date.today().isoformat(), **body}
+                state.accounts.append(account); state.users[account["id"]] = []; state.permissions[account["id"]] = []
+                return self._send(200, account)
+            if path == "/admin/users/":
+                if body["account_id"] not in state.users: return self._send(404, {"detail": "Conta não encontrada."})
+                user = {"id": state.new_id(), "full_name": body["full_name"], "email": body["email"], "is_active": True, "account_id": body["account_id"]}
+                state.users[body["account_id"]].append(user)
+                return self._send(200, {**user, "api_key": f"stub-{user['id']}"})
+            if path == "/admin/prompts/":
+                prompt = {"id": state.new_id(), **body}
+                state.prompts.append(prompt)
+                return self._send(200, prompt)
+            if m := re.fullmatch(r"/admin/users/(\d+)/regenerate-api-key", path): return self._send(200, {"api_key": f"stub-{m[1]}-{state.new_id()}"})
+        self._send(404, {"detail": "Not Found"})
+
+    def do_PUT(self):
+        if not self._authorized(): return
+        path, query = self._route()
+        body, state = self.body, self.server.state
+        active = query.get("active_status", ["True"])[0] == "True"
+        with state.lock:
+            if m := re.fullmatch(r"/admin/accounts/(\d+)/status", path):
+                for account in state.accounts:
+                    if account["id"] == int(m[1]): account["is_active"] = active
+                return self._send(200, {"ok": True})
+            if m := re.fullmatch(r"/admin/users/(\d+)/status", path):
+                for user in (u for users in state.users.values() for u in users):
+                    if user["id"] == int(m[1]): user["is_active"] = active
+                return self._send(200, {"ok": True})
+            if m := re.fullmatch(r"/admin/accounts/(\d+)/permissions", path):
+                state.permissions[int(m[1])] = list(body["prompt_ids"])
+                return self._send(200, {"prompt_ids": state.permissions[int(m[1])]})
+            if m := re.fullmatch(r"/admin/prompts/(\d+)", path):
+                for prompt in state.prompts:
+                    if prompt["id"] == int(m[1]): prompt.update(body)
+                return self._send(200, {"ok": True})
+        self._send(404, {"detail": "Not Found"})
+
+    def do_DELETE(self):
+        if not self._authorized(): return
+        path, _ = self._route()
+        state = self.server.state
+        with state.lock:
+            if m := re.fullmatch(r"/admin/prompts/(\d+)", path):
+                state.prompts = [p for p in state.prompts if p["id"] != int(m[1])]
+                for prompt_ids in state.permissions.values():
+                    if int(m[1]) in prompt_ids: prompt_ids.remove(int(m[1]))
+                return self._send(200, {"ok": True})
+        self._send(404, {"detail": "Not Found"})
+
+class StubGateway(ThreadingHTTPServer):
+    """Servidor HTTP do gateway de mentira; registra cada chamada (método, caminho, status, bytes) em .calls."""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, admin_key: str = "dev-key", state: Optional[StubState] = None,
+                 latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0, error_status: int = 503, seed: int = 42,
+                 head_supported: bool = True, prompt_get_supported: bool = True):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.admin_key = admin_key
+        self.state = state or StubState()
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.error_rate, self.error_status = error_rate, error_status
+        self.head_supported = head_supported
+        self.prompt_get_supported = prompt_get_supported  # False: GET /admin/prompts/{id} responde 405, como no gateway real
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.calls: List[Tuple[str, str, int, int]] = []
+        self._calls_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def simulate(self) -> bool:
+        """Espera a latência simulada (fixa + variação uniforme) e sorteia se a requisição deve falhar."""
+        with self._random_lock:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            fail = self._random.random() < self.error_rate
+        if delay > 0: time.sleep(delay / 1000)
+        return fail
+
+    def record(self, method: str, path: str, status: int, size: int):
+        with self._calls_lock: self.calls.append((method, urlparse(path).path, status, size))
+
+    def start(self) -> "StubGateway":
+        threading.Thread(target=self.serve_forever, daemon=True, name="stub-gateway").start()
+        return self
+
+    def stop(self):
+        self.shutdown(); self.server_close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--admin-key", default="dev-key")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração das requisições que recebem 503")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--users-per-account", type=int, default=3)
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--prompt-chars", type=int, default=2_000)
+    parser.add_argument("--jobs-per-day", type=int, default=10)
+    parser.add_argument("--no-head", action="store_true", help="Responde 405 a HEAD (gateway sem suporte)")
+    parser.add_argument("--no-prompt-get", action="store_true", help="Responde 405 a GET /admin/prompts/{id} (só PUT/DELETE)")
+    args = parser.parse_args()
+    state = StubState(args.accounts, args.users_per_account, args.prompts, args.prompt_chars, args.jobs_per_day)
+    gateway = StubGateway(args.port, args.admin_key, state, args.latency_ms, args.jitter_ms, args.error_rate, head_supported=not args.no_head,
+                          prompt_get_supported=not args.no_prompt_get)
+    print(f"Gateway de mentira em {gateway.base_url} (chave de admin: {args.admin_key})", flush=True)
+    gateway.serve_forever()
+
+if __name__ == "__main__":
+    main()
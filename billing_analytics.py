@@ -0,0 +1,199 @@
+# billing_analytics.py (AGREGAÇÕES DE FATURAMENTO A PARTIR DO DETALHE DE JOBS)
+
+import sys
+import numpy as np
+import pandas as pd
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Dict, Any, Optional, Tuple
+
+# --- CONFIGURAÇÃO ---
+JOB_COLUMNS = ['created_at', 'account_name', 'user_name', 'job_id', 'prompt_name', 'model_display_name', 'cost_brl', 'total_tokens']
+CATEGORY_COLUMNS = ['account_name', 'user_name', 'prompt_name', 'model_display_name']
+CREATED_AT_FORMAT = 'ISO8601'
+COST_DECIMALS = 8
+COST_SCALE = 10 ** COST_DECIMALS  # 'cost_e8' guarda o custo em unidades de R$ 0,00000001 (inteiro exato)
+# Dimensões de agrupamento disponíveis no dashboard (rótulo -> coluna)
+GROUP_COLUMNS = {
+    "Cartório": "account_name",
+    "Usuário": "user_name",
+    "Prompt": "prompt_name",
+    "Modelo": "model_display_name",
+    "Dia": "day",
+}
+# Nomes amigáveis dos modelos. O resumo do servidor usa o nome técnico e os jobs o de exibição;
+# os dois passam por model_label antes de serem exibidos ou comparados
+MODEL_NAME_MAP = {
+    "gemini-2.5-flash-lite": "Modelo Ultra",
+    "gemini-2.5-flash": "Modelo Fast",
+    "gemini-2.5-pro": "Modelo Pro",
+}
+# Consolidado diário: totais por dia, cartório e modelo, montado uma vez por relatório
+ROLLUP_COLUMNS = ['day', 'account_name', 'model_display_name']
+# Balde dos gráficos de tendência pelo tamanho do período: (máximo de dias, período do pandas, nome)
+TREND_BUCKETS = ((92, 'D', "dia"), (731, 'W', "semana"), (None, 'M', "mês"))
+TREND_METRICS = {"Custo (R$)": 'total_cost_brl', "Tokens": 'total_tokens', "Jobs": 'total_jobs'}
+TREND_MAX_SERIES = 8  # Linhas por gráfico ao separar por cartório/modelo; as demais somam em "Outros"
+
+def _cost_to_fixed_point(values: pd.Series) -> pd.Series:
+    """Converte cost_brl (texto decimal ou número) em inteiro exato de unidades de 1e-8 R$, sem passar por float.
+
+    O caso comum ("0.00012345") é convertido de forma vetorizada; o que não couber no padrão
+    (notação científica, mais de 8 casas) vai para Decimal com arredondamento comercial.
+    """
+    text = values.astype('string').str.strip()
+    parts = text.str.extract(r'^(?P<sign>-?)(?P<int>\d*)(?:\.(?P<frac>\d{0,%d}))?$' % COST_DECIMALS)
+    matched = parts['int'].notna() & (parts['int'].str.len() + parts['frac'].fillna('').str.len() > 0)
+    whole = pd.to_numeric(parts['int'].where(parts['int'] != '', '0'), errors='coerce').fillna(0).astype('int64')
+    frac = pd.to_numeric(parts['frac'].fillna('').str.pad(COST_DECIMALS, side='right', fillchar='0'), errors='coerce').fillna(0).astype('int64')
+    units = whole * COST_SCALE + frac
+    units = units.where(parts['sign'] != '-', -units)
+    for i in (~matched & text.notna()).to_numpy().nonzero()[0]:
+        try: units.iat[i] = int(Decimal(text.iat[i]).quantize(Decimal(1).scaleb(-COST_DECIMALS), ROUND_HALF_UP).scaleb(COST_DECIMALS))
+        except ArithmeticError: units.iat[i] = 0  # Valor inválido conta como custo zero
+    return units
+
+def model_label(name: Any) -> Any:
+    """Nome amigável do modelo a partir do nome técnico ou do de exibição (que passa como está quando não há tradução)."""
+    return MODEL_NAME_MAP.get(name, name)
+
+def _label_models(models: pd.Series) -> pd.Series:
+    """Coluna category de modelos com os nomes amigáveis (model_label), trocando só as categorias."""
+    labels = models.cat.categories.map(model_label)
+    if labels.is_unique: return models.cat.rename_categories(labels)
+    categories = pd.Index(labels.unique())  # Nome técnico e de exibição do mesmo modelo viram uma categoria só
+    codes = models.cat.codes.to_numpy()
+    merged = np.where(codes >= 0, categories.get_indexer(labels)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(merged, categories), index=models.index, name=models.name)
+
+def load_jobs_frame(jobs: List[Dict]) -> pd.DataFrame:
+    """Monta a tabela compacta de jobs a partir das linhas de get_detailed_billing_jobs.
+
+    Nomes (cartório, usuário, prompt, modelo) viram category, o custo vira 'cost_e8'
+    (inteiro exato, ver COST_SCALE) no lugar de cost_brl, created_at é lido com formato
+    explícito e 'day' guarda a data do job. O modelo fica com o nome amigável (model_label),
+    venha o job com o nome técnico ou o de exibição. A lista original pode ser descartada depois.
+    """
+    df = pd.DataFrame(jobs, columns=JOB_COLUMNS)
+    df['created_at'] = pd.to_datetime(df['created_at'], format=CREATED_AT_FORMAT)
+    for col in CATEGORY_COLUMNS: df[col] = df[col].astype('category')
+    df['model_display_name'] = _label_models(df['model_display_name'])
+    job_ids = pd.to_numeric(df['job_id'], errors='coerce')
+    if job_ids.notna().sum() == df['job_id'].notna().sum(): df['job_id'] = job_ids.astype('Int64')
+    df['cost_e8'] = _cost_to_fixed_point(df.pop('cost_brl'))
+    df['total_tokens'] = pd.to_numeric(df['total_tokens'], errors='coerce').fillna(0).astype('int64')
+    df['day'] = df['created_at'].dt.normalize()
+    return df
+
+def _estimate_rows_bytes(rows: List[Dict], sample_size: int = 1_000) -> int:
+    """Tamanho aproximado (bytes) da lista de dicts do JSON, extrapolado de uma amostra espaçada."""
+    if not rows: return sys.getsizeof(rows)
+    sample = rows[::max(1, len(rows) // sample_size)]
+    per_row = sum(sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values()) for row in sample) / len(sample)
+    return int(per_row * len(rows)) + sys.getsizeof(rows)
+
+def describe_memory_footprint(jobs: List[Dict], df: pd.DataFrame) -> Dict[str, float]:
+    """Memória (MB) da lista original de jobs (estimada) e da tabela compacta (exata)."""
+    return {
+        'raw_mb': _estimate_rows_bytes(jobs) / 2**20,
+        'frame_mb': float(df.memory_usage(deep=True).sum()) / 2**20,
+    }
+
+def _aggregate(df: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    grouped = (df.groupby(by, observed=True, sort=True, dropna=False)
+                 .agg(total_jobs=('total_tokens', 'size'), total_tokens=('total_tokens', 'sum'), total_cost_e8=('cost_e8', 'sum'))
+                 .reset_index())
+    grouped['total_cost_brl'] = grouped.pop('total_cost_e8') / COST_SCALE
+    return grouped
+
+def summarize_jobs(df: pd.DataFrame) -> Dict[str, Any]:
+    """Resumo no mesmo formato de get_master_billing_report ('summary' e 'by_model'), calculado localmente.
+
+    Em 'by_model' o modelo vem com o nome amigável (ver load_jobs_frame).
+    """
+    by_model = _aggregate(df, ['model_display_name']).rename(columns={'model_display_name': 'model'})
+    return {
+        'summary': {
+            'total_jobs': int(len(df)),
+            'total_tokens': int(df['total_tokens'].sum()),
+            'total_cost_brl': int(df['cost_e8'].sum()) / COST_SCALE,
+        },
+        'by_model': by_model.to_dict('records'),
+    }
+
+def build_daily_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """Consolidado diário (ROLLUP_COLUMNS) com total_jobs, total_tokens e total_cost_e8 (custo exato, ver COST_SCALE).
+
+    Montado uma vez por relatório; os gráficos de tendência, os filtros de modelo/cartório e os
+    agrupamentos que só usam dia, cartório e modelo saem dele, sem voltar à tabela de jobs.
+    """
+    return (df.groupby(ROLLUP_COLUMNS, observed=True, sort=True, dropna=False)
+              .agg(total_jobs=('total_tokens', 'size'), total_tokens=('total_tokens', 'sum'), total_cost_e8=('cost_e8', 'sum'))
+              .reset_index())
+
+def _aggregate_rollup(rollup: pd.DataFrame, by: List[str]) -> pd.DataFrame:
+    grouped = rollup.groupby(by, observed=True, sort=True, dropna=False)[['total_jobs', 'total_tokens', 'total_cost_e8']].sum().reset_index()
+    grouped['total_cost_brl'] = grouped.pop('total_cost_e8') / COST_SCALE
+    return grouped
+
+def pivot_jobs(df: pd.DataFrame, group_labels: List[str], rollup: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Totais de jobs, tokens e custo agrupados pelas dimensões escolhidas (rótulos de GROUP_COLUMNS), maior custo primeiro.
+
+    Com o consolidado diário, os agrupamentos só por dia, cartório e/ou modelo saem dele.
+    """
+    columns = [GROUP_COLUMNS[label] for label in group_labels]
+    if rollup is not None and set(columns) <= set(ROLLUP_COLUMNS): pivot = _aggregate_rollup(rollup, columns)
+    else: pivot = _aggregate(df, columns)
+    pivot = pivot.sort_values('total_cost_brl', ascending=False)
+    return pivot.rename(columns={col: label for label, col in GROUP_COLUMNS.items()})
+
+def trend_bucket(start_date: str, end_date: str) -> Tuple[str, str]:
+    """(período do pandas, nome) do balde dos gráficos: diário, semanal ou mensal conforme o tamanho do período (TREND_BUCKETS)."""
+    days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+    return next((freq, name) for max_days, freq, name in TREND_BUCKETS if max_days is None or days <= max_days)
+
+def trend_series(rollup: pd.DataFrame, metric: str, start_date: str, end_date: str, models: Optional[List[str]] = None,
+                 accounts: Optional[List[str]] = None, split_by: Optional[str] = None) -> Tuple[pd.DataFrame, str]:
+    """Série temporal da métrica (coluna de TREND_METRICS) a partir do consolidado diário, já reduzida ao balde do período.
+
+    Filtra por modelos/cartórios e, com split_by ('model_display_name' ou 'account_name'), traz
+    uma coluna por valor (os TREND_MAX_SERIES maiores; o resto em "Outros"). O índice é o início
+    de cada balde, sem lacunas entre start_date e end_date. Devolve (série, nome do balde).
+    """
+    freq, bucket_name = trend_bucket(start_date, end_date)
+    rows = rollup
+    if models: rows = rows[rows['model_display_name'].isin(models)]
+    if accounts: rows = rows[rows['account_name'].isin(accounts)]
+    value_column = 'total_cost_e8' if metric == 'total_cost_brl' else metric
+    buckets = rows['day'].dt.to_period(freq).rename('bucket')
+    if split_by:
+        labels = rows[split_by].astype('string').fillna("(sem nome)")
+        top = rows.groupby(labels, sort=False)[value_column].sum().nlargest(TREND_MAX_SERIES).index
+        labels = labels.where(labels.isin(top), "Outros")
+        series = rows[value_column].groupby([buckets, labels.rename(split_by)]).sum().unstack(split_by, fill_value=0)
+    else:
+        series = rows[value_column].groupby(buckets).sum().to_frame(metric)
+    series = series.reindex(pd.period_range(start_date, end_date, freq=freq), fill_value=0)
+    if metric == 'total_cost_brl': series = series / COST_SCALE
+    series.index = series.index.to_timestamp()
+    return series, bucket_name
+
+def compare_with_server_summary(local: Dict[str, Any], server: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """(divergências entre o resumo local e o do servidor, modelos que não foram conferidos).
+
+    Os modelos são casados pelo nome amigável (model_label); os que só aparecem de um lado, ou cujo
+    nome não tem tradução, ficam de fora da conferência por modelo e são devolvidos na segunda lista.
+    """
+    divergences = []
+    for field in ('total_jobs', 'total_tokens'):
+        local_value, server_value = local['summary'].get(field), (server.get('summary') or {}).get(field)
+        if server_value is not None and local_value != server_value:
+            divergences.append(f"{field}: local {local_value:,} x servidor {server_value:,}")
+    local_by_model = {model_label(row['model']): row for row in local['by_model']}
+    server_by_model = {model_label(row.get('model')): row for row in server.get('by_model') or []}
+    for model in local_by_model.keys() & server_by_model.keys():
+        local_row, server_row = local_by_model[model], server_by_model[model]
+        for field in ('total_jobs', 'total_tokens'):
+            if field in server_row and local_row[field] != server_row[field]:
+                divergences.append(f"{model} / {field}: local {local_row[field]:,} x servidor {server_row[field]:,}")
+    unmatched = sorted(str(model) for model in local_by_model.keys() ^ server_by_model.keys())
+    return divergences, unmatched
@@ -0,0 +1,89 @@
+# billing_cache.py (CACHE LOCAL DE JOBS DE FATURAMENTO, PARTICIONADO POR DIA)
+
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterable, Iterator
+from datetime import date, timedelta
+
+# --- CONFIGURAÇÃO ---
+BILLING_CACHE_PATH = os.environ.get("TRI7_BILLING_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "billing_jobs.sqlite3"))
+BILLING_MUTABLE_DAYS = 2  # Hoje e ontem ainda podem receber jobs: sempre buscados de novo
+
+class BillingJobCache:
+    """Guarda em SQLite as linhas de get_detailed_billing_jobs, uma partição por (credencial, conta, dia).
+
+    Dias passados não mudam, então só os dias ausentes ou ainda "abertos" (ver
+    BILLING_MUTABLE_DAYS) precisam ir ao gateway; o resto do período sai do disco.
+    Dias sem jobs também são gravados (lista vazia) para não serem buscados de novo.
+    """
+
+    def __init__(self, path: str = BILLING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS billing_jobs (
+                scope TEXT NOT NULL, account TEXT NOT NULL, day TEXT NOT NULL,
+                fetched_at TEXT NOT NULL, jobs TEXT NOT NULL,
+                PRIMARY KEY (scope, account, day))""")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn  # commit/rollback
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _account_key(account_id: Optional[int]) -> str:
+        return "all" if account_id is None else str(account_id)
+
+    def missing_days(self, scope: str, account_id: Optional[int], start_date: date, end_date: date, today: Optional[date] = None) -> List[date]:
+        """Dias do período que precisam ser buscados: os ainda abertos e os que não estão completos no disco.
+
+        Um dia guardado só é completo se foi buscado depois de fechar (fetched_at posterior a
+        day + BILLING_MUTABLE_DAYS - 1); um dia buscado enquanto ainda era hoje ou ontem pode ter
+        recebido jobs depois e é buscado de novo.
+        """
+        first_open_day = (today or date.today()) - timedelta(days=BILLING_MUTABLE_DAYS - 1)
+        with self._connect() as conn:
+            fetched = {day: date.fromisoformat(fetched_at) for day, fetched_at in conn.execute(
+                "SELECT day, fetched_at FROM billing_jobs WHERE scope = ? AND account = ? AND day BETWEEN ? AND ?",
+                (scope, self._account_key(account_id), str(start_date), str(end_date)))}
+        def complete(d: date) -> bool:
+            return str(d) in fetched and fetched[str(d)] > d + timedelta(days=BILLING_MUTABLE_DAYS - 1)
+        days = (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+        return [d for d in days if d >= first_open_day or not complete(d)]
+
+    def store(self, scope: str, account_id: Optional[int], days: Iterable[date], jobs: List[Dict]):
+        """Grava os jobs de uma busca que cobriu exatamente os dias informados, separando-os por dia.
+
+        A data vem do prefixo de created_at; jobs fora dos dias pedidos (ex.: diferença de fuso
+        com o gateway) ficam no dia pedido mais próximo, para que nenhum job se perca.
+        """
+        days = sorted(str(d) for d in days)
+        if not days: return
+        partitions: Dict[str, List[Dict]] = {d: [] for d in days}
+        for job in jobs:
+            day = str(job.get("created_at") or "")[:10]
+            if day not in partitions: day = days[0] if day < days[0] else days[-1]
+            partitions[day].append(job)
+        fetched_at = date.today().isoformat()
+        rows = [(scope, self._account_key(account_id), d, fetched_at, json.dumps(p, separators=(",", ":"))) for d, p in partitions.items()]
+        with self._lock, self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO billing_jobs (scope, account, day, fetched_at, jobs) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def load(self, scope: str, account_id: Optional[int], start_date: date, end_date: date) -> List[Dict]:
+        """Todos os jobs do período guardados no disco, em ordem de dia."""
+        jobs: List[Dict] = []
+        with self._connect() as conn:
+            for (payload,) in conn.execute(
+                    "SELECT jobs FROM billing_jobs WHERE scope = ? AND account = ? AND day BETWEEN ? AND ? ORDER BY day",
+                    (scope, self._account_key(account_id), str(start_date), str(end_date))):
+                jobs.extend(json.loads(payload))
+        return jobs
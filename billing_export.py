@@ -0,0 +1,142 @@
+# billing_export.py (EXPORTAÇÃO DO RELATÓRIO DETALHADO EM XLSX/CSV/PARQUET COM MEMÓRIA CONSTANTE)
+
+import os
+import tempfile
+import importlib.util
+import pandas as pd
+from typing import List, Dict, Any, Callable
+from billing_analytics import COST_SCALE, COST_DECIMALS
+
+# --- CONFIGURAÇÃO ---
+# Coluna da tabela de jobs (ver billing_analytics.load_jobs_frame; cost_brl sai de cost_e8) -> cabeçalho no arquivo exportado
+EXPORT_COLUMNS = {
+    'created_at': 'Data',
+    'account_name': 'Cartório',
+    'user_name': 'Usuário',
+    'job_id': 'ID do Job',
+    'prompt_name': 'Prompt',
+    'model_display_name': 'Modelo',
+    'cost_brl': 'Custo (R$)',
+    'total_tokens': 'Tokens Brutos',
+}
+SHEET_NAME = 'RelatorioFaturamento'
+XLSX_MAX_ROWS = 1_048_576  # Limite de linhas de uma planilha do Excel (com o cabeçalho); o excedente vai para outras abas
+EXCEL_DATE_FORMAT = 'dd/mm/yyyy hh:mm:ss'
+TEXT_DATE_FORMAT = '%d/%m/%Y %H:%M:%S'
+CHUNK_ROWS = 50_000  # Linhas convertidas por vez; limita as cópias temporárias
+WIDTH_SAMPLE_ROWS = 2_000  # Linhas amostradas para estimar a largura das colunas
+MAX_COLUMN_WIDTH = 60
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+def _export_view(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas exportadas de um bloco da tabela, com o custo exato (cost_e8) convertido para R$."""
+    if 'cost_e8' in df.columns: df = df.assign(cost_brl=df['cost_e8'] / COST_SCALE)
+    return df[[col for col in EXPORT_COLUMNS if col in df.columns]]
+
+def _chunks(df: pd.DataFrame):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield start, _export_view(df.iloc[start:start + CHUNK_ROWS])
+
+def _estimate_width(sample: pd.Series, header: str) -> int:
+    """Largura da coluna a partir de uma amostra espaçada das linhas, sem converter a coluna inteira em texto."""
+    if pd.api.types.is_datetime64_any_dtype(sample):
+        width = len('00/00/0000 00:00:00')
+    else:
+        sample = sample.dropna()
+        width = int(sample.astype(str).str.len().max()) if len(sample) else 0
+    return min(max(width, len(header)) + 2, MAX_COLUMN_WIDTH)
+
+def _excel_values(series: pd.Series) -> List[Any]:
+    """Valores prontos para o xlsxwriter: datas viram número serial do Excel (formatado como data), faltantes viram None."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.dt.tz is not None: series = series.dt.tz_localize(None)  # mantém o horário local original
+        series = (series - pd.Timestamp('1899-12-30')) / pd.Timedelta(days=1)
+    elif series.name == 'cost_brl':
+        series = series.round(COST_DECIMALS)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def write_xlsx(df: pd.DataFrame, path: str):
+    """Grava o relatório em XLSX no modo constant_memory do xlsxwriter (linha a linha, direto no disco).
+
+    Acima de XLSX_MAX_ROWS as linhas continuam em novas abas (RelatorioFaturamento_2, _3...), cada uma
+    com o cabeçalho. Se o xlsxwriter recusar alguma célula, levanta RuntimeError em vez de perder linhas.
+    """
+    import xlsxwriter  # Só na primeira exportação em XLSX, não ao abrir o dashboard
+    sample = _export_view(df.iloc[::max(1, len(df) // WIDTH_SAMPLE_ROWS)])
+    columns = list(sample.columns)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+    date_format = workbook.add_format({'num_format': EXCEL_DATE_FORMAT})
+    cost_format = workbook.add_format({'num_format': '0.' + '0' * COST_DECIMALS})
+
+    # (método do worksheet, formato, conversão) de cada coluna
+    cells: List[tuple] = []
+    for col in columns:
+        series = sample[col]
+        if pd.api.types.is_datetime64_any_dtype(series): cells.append(('write_number', date_format, None))
+        elif col == 'cost_brl': cells.append(('write_number', cost_format, None))
+        elif pd.api.types.is_numeric_dtype(series): cells.append(('write_number', None, None))
+        else: cells.append(('write_string', None, str))
+    widths = [_estimate_width(sample[col], EXPORT_COLUMNS[col]) for col in columns]
+
+    rows_per_sheet = XLSX_MAX_ROWS - 1
+    try:
+        for sheet, sheet_start in enumerate(range(0, max(len(df), 1), rows_per_sheet), start=1):
+            worksheet = workbook.add_worksheet(SHEET_NAME if sheet == 1 else f'{SHEET_NAME}_{sheet}')
+            for i, width in enumerate(widths): worksheet.set_column(i, i, width)
+            worksheet.write_row(0, 0, [EXPORT_COLUMNS[col] for col in columns], header_format)
+            writers: List[Callable[[int, int, Any], int]] = []
+            for method, cell_format, convert in cells:
+                write = getattr(worksheet, method)
+                if convert is not None: writers.append(lambda r, c, v, write=write, convert=convert: write(r, c, convert(v)))
+                elif cell_format is not None: writers.append(lambda r, c, v, write=write, cell_format=cell_format: write(r, c, v, cell_format))
+                else: writers.append(write)
+            for start, chunk in _chunks(df.iloc[sheet_start:sheet_start + rows_per_sheet]):
+                for offset, row in enumerate(zip(*(_excel_values(chunk[col]) for col in columns)), start=start + 1):
+                    for c, value in enumerate(row):
+                        if value is not None and writers[c](offset, c, value) < 0:
+                            raise RuntimeError(f"O xlsxwriter recusou a célula (linha {offset + 1}, coluna {c + 1}) da aba "
+                                               f"{worksheet.name}; exporte em CSV ou Parquet.")
+    finally:
+        workbook.close()
+
+def write_csv(df: pd.DataFrame, path: str):
+    """Grava o relatório em CSV (padrão do Excel em português: ';' e vírgula decimal), em blocos."""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        for start, chunk in _chunks(df):
+            chunk.rename(columns=EXPORT_COLUMNS).to_csv(
+                f, header=start == 0, index=False, sep=';', decimal=',',
+                date_format=TEXT_DATE_FORMAT, float_format=f'%.{COST_DECIMALS}f')
+
+def write_parquet(df: pd.DataFrame, path: str):
+    """Grava o relatório em Parquet (tipos nativos), um row group por bloco. Requer pyarrow."""
+    if not PARQUET_AVAILABLE: raise RuntimeError("Exportação Parquet indisponível: instale o pacote 'pyarrow'.")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for _, chunk in _chunks(df):
+            table = pa.Table.from_pandas(chunk.rename(columns=EXPORT_COLUMNS), preserve_index=False)
+            if writer is None: writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None: writer.close()
+
+# Formato -> (função de escrita, extensão, MIME, rótulo)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    'xlsx': (write_xlsx, 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'Excel (.xlsx)'),
+    'csv': (write_csv, 'csv', 'text/csv', 'CSV (.csv)'),
+}
+if PARQUET_AVAILABLE:
+    EXPORT_FORMATS['parquet'] = (write_parquet, 'parquet', 'application/vnd.apache.parquet', 'Parquet (.parquet)')
+
+def export_to_file(df: pd.DataFrame, fmt: str) -> str:
+    """Gera o arquivo de exportação num arquivo temporário e devolve o caminho (quem chama remove o arquivo)."""
+    writer, extension = EXPORT_FORMATS[fmt][:2]
+    fd, path = tempfile.mkstemp(prefix='relatorio_', suffix=f'.{extension}')
+    os.close(fd)
+    try:
+        writer(df, path)
+    except Exception:
+        os.remove(path); raise
+    return path
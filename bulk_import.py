@@ -0,0 +1,190 @@
+# bulk_import.py (IMPORTAÇÃO EM LOTE DE CONTAS E USUÁRIOS A PARTIR DE CSV/XLSX)
+#
+# Cada linha do arquivo é um usuário de um cartório; linhas sem usuário só criam a conta.
+# O arquivo inteiro é validado antes de qualquer chamada: com um erro que seja, nada é criado.
+
+import io
+import re
+import time
+import threading
+import requests
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import api_metrics
+from shared_funcs import _post_account, _post_user, api_error_detail, get_all_accounts, get_users_for_account
+
+# --- CONFIGURAÇÃO ---
+# Coluna do arquivo -> descrição (usada no modelo para download e nas mensagens de erro)
+IMPORT_COLUMNS = {
+    'conta': 'Nome do cartório (obrigatório)',
+    'cod_tri7': 'Código TRI7 (opcional, apenas números)',
+    'cidade': 'Município (opcional)',
+    'uf': 'UF (opcional, 2 letras)',
+    'nome_usuario': 'Nome completo do usuário (vazio = só cria a conta)',
+    'email': 'Email do usuário',
+    'senha': 'Senha inicial do usuário',
+}
+ACCOUNT_FIELDS = ['cod_tri7', 'cidade', 'uf']
+USER_FIELDS = ['nome_usuario', 'email', 'senha']
+IMPORT_MAX_ROWS = 5_000
+IMPORT_MAX_WORKERS = 4
+IMPORT_MAX_PER_SECOND = 5.0  # Teto de criações por segundo somando todas as threads
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `per_second` por segundo entre todas as threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+def template_csv() -> bytes:
+    """Modelo de arquivo para download, com uma conta nova e dois usuários."""
+    rows = [
+        {'conta': 'Cartório Exemplo', 'cod_tri7': 1234, 'cidade': 'São Paulo', 'uf': 'SP', 'nome_usuario': 'Maria Silva', 'email': 'maria@exemplo.com.br', 'senha': 'trocar-depois'},
+        {'conta': 'Cartório Exemplo', 'cod_tri7': 1234, 'cidade': 'São Paulo', 'uf': 'SP', 'nome_usuario': 'João Souza', 'email': 'joao@exemplo.com.br', 'senha': 'trocar-depois'},
+    ]
+    return pd.DataFrame(rows, columns=list(IMPORT_COLUMNS)).to_csv(index=False, sep=';').encode('utf-8-sig')
+
+def read_import_file(name: str, data: bytes) -> pd.DataFrame:
+    """Lê o CSV (separador detectado) ou XLSX como texto, com os nomes de coluna normalizados."""
+    if name.lower().endswith('.xlsx'):
+        df = pd.read_excel(io.BytesIO(data), dtype=str)
+    else:
+        df = pd.read_csv(io.BytesIO(data), dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+    df.columns = [str(col).strip().lower().replace(' ', '_') for col in df.columns]
+    df = df.astype(object).apply(lambda col: col.str.strip())
+    return df.where(df.notna() & (df != ''), None)  # Célula vazia vira None
+
+def _key(name: str) -> str:
+    return ' '.join(name.split()).casefold()
+
+def validate_import(df: pd.DataFrame, existing_accounts: List[Dict]) -> Tuple[Dict[str, Any], List[str]]:
+    """Valida o arquivo inteiro e monta o plano de importação.
+
+    Devolve (plano, erros). O plano tem 'accounts' (uma entrada por cartório do arquivo, com
+    'existing_id' quando a conta já existe pelo nome) e 'users' (uma entrada por linha com usuário).
+    Linhas são numeradas como na planilha (cabeçalho = linha 1).
+    """
+    errors: List[str] = []
+    missing = [col for col in ('conta', *USER_FIELDS) if col not in df.columns]
+    if missing: return {'accounts': [], 'users': []}, [f"Colunas obrigatórias ausentes: {', '.join(missing)}."]
+    if df.empty: return {'accounts': [], 'users': []}, ["O arquivo não tem linhas."]
+    if len(df) > IMPORT_MAX_ROWS: return {'accounts': [], 'users': []}, [f"O arquivo tem {len(df):,} linhas; o limite é {IMPORT_MAX_ROWS:,}."]
+    for col in ACCOUNT_FIELDS:
+        if col not in df.columns: df[col] = None
+
+    existing = {_key(acc['name']): acc['id'] for acc in existing_accounts}
+    accounts: Dict[str, Dict[str, Any]] = {}
+    users: List[Dict[str, Any]] = []
+    emails: Dict[str, int] = {}
+    for line, row in enumerate(df.to_dict('records'), start=2):
+        name = row['conta']
+        if not name:
+            errors.append(f"Linha {line}: 'conta' vazia."); continue
+        cod_tri7, uf = row['cod_tri7'], row['uf']
+        if cod_tri7 and not cod_tri7.removesuffix('.0').isdigit(): errors.append(f"Linha {line}: 'cod_tri7' deve conter apenas números ('{cod_tri7}').")
+        if uf and not (len(uf) == 2 and uf.isalpha()): errors.append(f"Linha {line}: 'uf' deve ter 2 letras ('{uf}').")
+        fields = {
+            'cod_tri7': int(cod_tri7.removesuffix('.0')) if cod_tri7 and cod_tri7.removesuffix('.0').isdigit() else None,
+            'cidade': row['cidade'],
+            'uf': uf.upper() if uf else None,
+        }
+        account = accounts.setdefault(_key(name), {'name': ' '.join(name.split()), 'existing_id': existing.get(_key(name)), 'line': line, **fields})
+        for field, value in fields.items():
+            if value is not None and account[field] is not None and account[field] != value:
+                errors.append(f"Linha {line}: '{field}' diferente do informado para '{account['name']}' na linha {account['line']}.")
+            elif account[field] is None: account[field] = value
+
+        full_name, email, password = (row[col] for col in USER_FIELDS)
+        if not any((full_name, email, password)): continue
+        if not all((full_name, email, password)):
+            errors.append(f"Linha {line}: preencha 'nome_usuario', 'email' e 'senha' (ou deixe os três vazios para só criar a conta)."); continue
+        if not EMAIL_PATTERN.match(email):
+            errors.append(f"Linha {line}: email inválido ('{email}')."); continue
+        if _key(email) in emails:
+            errors.append(f"Linha {line}: email '{email}' repetido (linha {emails[_key(email)]})."); continue
+        emails[_key(email)] = line
+        users.append({'line': line, 'account_key': _key(name), 'full_name': full_name, 'email': email, 'password': password})
+
+    return {'accounts': list(accounts.values()), 'users': users}, errors
+
+def run_import(plan: Dict[str, Any], api_key: str, on_progress: Optional[Callable[[int, int], None]] = None,
+               max_workers: int = IMPORT_MAX_WORKERS, per_second: float = IMPORT_MAX_PER_SECOND) -> List[Dict[str, Any]]:
+    """Cria as contas novas e depois os usuários, em paralelo e com limite de chamadas por segundo.
+
+    As threads só fazem HTTP; on_progress(feitos, total) é chamado na thread de quem chamou.
+    Os caches de contas e de usuários das contas afetadas são invalidados uma vez, no fim.
+    Devolve uma linha de resultado por conta nova e por usuário, com IDs e chaves de API criadas.
+    """
+    new_accounts = [acc for acc in plan['accounts'] if acc['existing_id'] is None]
+    total, done = len(new_accounts) + len(plan['users']), 0
+    limiter = RateLimiter(per_second)
+    account_ids = {_key(acc['name']): acc['existing_id'] for acc in plan['accounts'] if acc['existing_id'] is not None}
+    results: List[Dict[str, Any]] = []
+
+    @api_metrics.propagate
+    def call(fn, *args):
+        limiter.wait()
+        return fn(*args, api_key)
+
+    def step():
+        nonlocal done
+        done += 1
+        if on_progress: on_progress(done, total)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk-import") as pool:
+            futures = {pool.submit(call, _post_account, acc['name'], acc['cod_tri7'], acc['cidade'], acc['uf']): acc for acc in new_accounts}
+            for future in as_completed(futures):
+                acc = futures[future]
+                result = {'linha': acc['line'], 'tipo': 'conta', 'conta': acc['name'], 'account_id': None, 'nome_usuario': None,
+                          'email': None, 'user_id': None, 'api_key': None, 'status': 'criada', 'erro': None}
+                try:
+                    account_ids[_key(acc['name'])] = result['account_id'] = future.result().get('id')
+                except requests.exceptions.RequestException as e:
+                    result.update(status='falhou', erro=api_error_detail(e))
+                results.append(result); step()
+
+            futures = {}
+            for user in plan['users']:
+                account_id = account_ids.get(user['account_key'])
+                if account_id is None:
+                    results.append({'linha': user['line'], 'tipo': 'usuário', 'conta': user['account_key'], 'account_id': None,
+                                    'nome_usuario': user['full_name'], 'email': user['email'], 'user_id': None, 'api_key': None,
+                                    'status': 'ignorado', 'erro': 'A conta deste usuário não foi criada.'})
+                    step(); continue
+                futures[pool.submit(call, _post_user, user['full_name'], user['email'], user['password'], account_id)] = (user, account_id)
+            for future in as_completed(futures):
+                user, account_id = futures[future]
+                result = {'linha': user['line'], 'tipo': 'usuário', 'conta': user['account_key'], 'account_id': account_id,
+                          'nome_usuario': user['full_name'], 'email': user['email'], 'user_id': None, 'api_key': None, 'status': 'criado', 'erro': None}
+                try:
+                    created = future.result()
+                    result.update(user_id=created.get('id'), api_key=created.get('api_key'))
+                except requests.exceptions.RequestException as e:
+                    result.update(status='falhou', erro=api_error_detail(e))
+                results.append(result); step()
+    finally:
+        get_all_accounts.invalidate(api_key)
+        for account_id in set(account_ids.values()): get_users_for_account.invalidate(account_id, api_key)
+
+    names = {_key(acc['name']): acc['name'] for acc in plan['accounts']}
+    for result in results: result['conta'] = names.get(result['conta'], result['conta'])
+    return sorted(results, key=lambda r: (r['linha'], r['tipo'] != 'conta'))
+
+def results_to_csv(results: List[Dict[str, Any]]) -> bytes:
+    """Arquivo de resultado da importação (inclui as chaves de API, que só aparecem uma vez)."""
+    columns = ['linha', 'tipo', 'conta', 'account_id', 'nome_usuario', 'email', 'user_id', 'api_key', 'status', 'erro']
+    df = pd.DataFrame(results, columns=columns)
+    for col in ('account_id', 'user_id'): df[col] = df[col].astype('Int64')
+    return df.to_csv(index=False, sep=';').encode('utf-8-sig')
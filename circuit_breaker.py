@@ -0,0 +1,106 @@
+# circuit_breaker.py (DISJUNTORES DAS CHAMADAS AO GATEWAY: FALHA RÁPIDA QUANDO ELE ESTÁ LENTO OU FORA DO AR)
+#
+# Um disjuntor por gateway e um por (gateway, endpoint). Falhas seguidas do gateway (erro de conexão,
+# timeout, 5xx/429 depois das retentativas) abrem o do gateway, que barra todos os endpoints; respostas
+# acima do orçamento de latência de um endpoint abrem só o dele. Com o disjuntor aberto as chamadas
+# falham na hora com CircuitOpenError, sem prender threads esperando o gateway.
+# Depois de BREAKER_RESET_SECONDS uma única chamada de teste passa (meio-aberto): se der certo o
+# disjuntor fecha, senão abre de novo. Como CircuitOpenError é uma RequestException, os tratamentos
+# de erro existentes continuam valendo; as leituras caem no último valor bom do cache (shared_funcs).
+
+import time
+import threading
+import requests
+from typing import List, Dict, Any, Optional, Tuple
+
+# --- CONFIGURAÇÃO ---
+BREAKER_FAILURE_THRESHOLD = 3  # Falhas seguidas que abrem o disjuntor
+BREAKER_RESET_SECONDS = 30  # Tempo aberto antes de deixar passar a chamada de teste
+FAILURE_STATUSES = (429, 500, 502, 503, 504)  # Status que indicam gateway sobrecarregado ou fora do ar
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Chamada recusada sem ir ao gateway porque o disjuntor do endpoint está aberto.
+
+    retry_in: segundos até o disjuntor liberar a chamada de teste (0 se já está meio-aberto).
+    """
+
+    def __init__(self, *args, retry_in: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_in = retry_in
+
+def is_gateway_failure(e: requests.exceptions.RequestException) -> bool:
+    """Falha do gateway (disjuntor aberto, conexão, timeout, 5xx/429), e não da requisição (403, 404, 422...)."""
+    if isinstance(e, (CircuitOpenError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)): return True
+    return e.response is not None and e.response.status_code in FAILURE_STATUSES
+
+class CircuitBreaker:
+    """Disjuntor de um endpoint: closed -> open (após N falhas seguidas) -> half_open (uma chamada de teste) -> closed/open."""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold, self.reset_seconds = failure_threshold, reset_seconds
+        self.state = 'closed'
+        self.failures = 0  # Falhas seguidas
+        self.last_error: Optional[str] = None
+        self.opened_at = 0.0
+        self.probe_started: Optional[float] = None  # Chamada de teste em andamento (meio-aberto)
+        self.rejected = 0  # Chamadas recusadas desde que abriu
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Levanta CircuitOpenError se a chamada não deve ir ao gateway; no meio-aberto, libera uma só chamada de teste."""
+        with self._lock:
+            if self.state == 'closed': return
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+            # Uma chamada de teste que nunca registrou resultado não bloqueia o endpoint para sempre
+            if self.state == 'half_open' and (self.probe_started is None or now - self.probe_started >= self.reset_seconds):
+                self.probe_started = now
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.reset_seconds - (now - self.opened_at))
+            raise CircuitOpenError(f"Gateway indisponível em {self.name} ({self.failures} falhas seguidas, última: {self.last_error}); "
+                                   f"a operação não foi enviada. Nova tentativa automática em {retry_in:.0f}s.", retry_in=retry_in)
+
+    def cancel_probe(self):
+        """Devolve a vez da chamada de teste liberada por before_call quando ela não chegou a ser feita."""
+        with self._lock: self.probe_started = None
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self.probe_started, self.rejected = 'closed', 0, None, 0
+
+    def record_failure(self, reason: str):
+        with self._lock:
+            self.failures += 1
+            self.last_error = reason
+            self.probe_started = None
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open': self.rejected = 0
+                self.state, self.opened_at = 'open', time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)) if self.state == 'open' else None
+            return {'endpoint': self.name, 'state': self.state, 'failures': self.failures, 'rejected': self.rejected,
+                    'last_error': self.last_error, 'retry_in_s': round(retry_in) if retry_in is not None else None}
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def breaker_for(base_url: str, endpoint: Optional[str] = None) -> CircuitBreaker:
+    """Disjuntor do endpoint (caminho com {id}, ver api_metrics.endpoint_template) ou, sem endpoint, do gateway inteiro.
+
+    Compartilhado por todas as credenciais e sessões do processo.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get((base_url, endpoint))
+        if breaker is None: breaker = _breakers[(base_url, endpoint)] = CircuitBreaker(endpoint or "todos os endpoints")
+        return breaker
+
+def breaker_states() -> List[Dict[str, Any]]:
+    """Estado de cada disjuntor, os abertos primeiro (para o painel de desempenho)."""
+    with _breakers_lock: breakers = list(_breakers.values())
+    order = {'open': 0, 'half_open': 1, 'closed': 2}
+    return sorted((breaker.snapshot() for breaker in breakers), key=lambda s: (order[s['state']], s['endpoint']))
@@ -0,0 +1,130 @@
+# directory.py (ÍNDICE EM MEMÓRIA DE CONTAS, USUÁRIOS E PROMPTS PARA CONSULTA E BUSCA)
+#
+# As listas vindas do cache da API são imutáveis (as mutações trocam a lista inteira), então o
+# índice é montado uma vez por lista e reaproveitado em todos os reruns enquanto ela não mudar.
+
+import re
+import bisect
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+# --- CONFIGURAÇÃO ---
+ACCOUNT_SEARCH_FIELDS = ('name', 'cidade', 'uf', 'cod_tri7')
+USER_SEARCH_FIELDS = ('full_name', 'email')
+DIRECTORY_CACHE_SIZE = 64  # Índices mantidos (um por lista de contas, de usuários de uma conta, de prompts...)
+COMBINED_CACHE_SIZE = 4  # Listas unificadas de usuários de várias contas mantidas para a busca global
+
+def normalize(value: Any) -> str:
+    """Texto sem acentos e em minúsculas, para comparar e ordenar ('São' == 'sao')."""
+    text = unicodedata.normalize('NFKD', str(value))
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+def _terms(value: Any) -> Iterable[str]:
+    """Termos indexados de um campo: cada palavra e o valor inteiro (para buscar 'maria@exem')."""
+    if value is None: return ()
+    text = normalize(value).strip()
+    return {text, *(word for word in re.split(r'[^\w]+', text) if word)} - {''}
+
+class Directory:
+    """Índice de uma lista de registros com 'id': mapa id -> registro, ordem por nome, ativos/inativos e busca por prefixo.
+
+    A busca ignora acentos e maiúsculas; cada palavra da consulta precisa ser prefixo de
+    algum termo de algum dos campos indexados, e o resultado sai na ordem por nome.
+    """
+
+    def __init__(self, records: List[Dict], label_field: str, search_fields: Tuple[str, ...]):
+        self.label_field = label_field
+        self.by_id: Dict[Any, Dict] = {record['id']: record for record in records}
+        self.ordered: List[Dict] = sorted(records, key=lambda r: (normalize(r.get(label_field) or ''), r['id']))
+        self.ids: List[Any] = [record['id'] for record in self.ordered]
+        self.active: List[Dict] = [record for record in self.ordered if record.get('is_active', True)]
+        self.inactive: List[Dict] = [record for record in self.ordered if not record.get('is_active', True)]
+        postings: Dict[str, set] = {}
+        for rank, record in enumerate(self.ordered):
+            for field in search_fields:
+                for term in _terms(record.get(field)): postings.setdefault(term, set()).add(rank)
+        self._terms = sorted(postings)
+        self._postings = [postings[term] for term in self._terms]
+
+    def __len__(self) -> int:
+        return len(self.ordered)
+
+    def get(self, record_id: Any) -> Optional[Dict]:
+        return self.by_id.get(record_id)
+
+    def label(self, record_id: Any) -> str:
+        record = self.by_id.get(record_id)
+        return str(record.get(self.label_field)) if record else str(record_id)
+
+    def _prefix(self, prefix: str) -> set:
+        ranks: set = set()
+        for i in range(bisect.bisect_left(self._terms, prefix), len(self._terms)):
+            if not self._terms[i].startswith(prefix): break
+            ranks |= self._postings[i]
+        return ranks
+
+    def search(self, query: str = "", active: Optional[bool] = None) -> List[Dict]:
+        """Registros que casam com todas as palavras da consulta (vazia = todos), filtrados por status se `active` for dado."""
+        words = [word for word in re.split(r'\s+', normalize(query).strip()) if word]
+        if not words:
+            return self.ordered if active is None else self.active if active else self.inactive
+        ranks = self._prefix(words[0])
+        for word in words[1:]:
+            if not ranks: break
+            ranks &= self._prefix(word)
+        matches = [self.ordered[rank] for rank in sorted(ranks)]
+        if active is None: return matches
+        return [record for record in matches if record.get('is_active', True) == active]
+
+_directories: "OrderedDict[tuple, Tuple[List[Dict], Directory]]" = OrderedDict()
+_directories_lock = threading.Lock()
+
+def get_directory(records: List[Dict], label_field: str = 'name', search_fields: Tuple[str, ...] = ('name',)) -> Directory:
+    """Índice da lista `records`, montado uma vez por lista (identidade do objeto) e reaproveitado nos reruns.
+
+    A entrada guarda a própria lista, então o id() não é reaproveitado por outra enquanto ela estiver no cache.
+    """
+    key = (id(records), label_field, search_fields)
+    with _directories_lock:
+        entry = _directories.get(key)
+        if entry is not None and entry[0] is records:
+            _directories.move_to_end(key)
+            return entry[1]
+    directory = Directory(records, label_field, search_fields)
+    with _directories_lock:
+        _directories[key] = (records, directory)
+        _directories.move_to_end(key)
+        while len(_directories) > DIRECTORY_CACHE_SIZE: _directories.popitem(last=False)
+    return directory
+
+def account_directory(accounts: List[Dict]) -> Directory:
+    """Índice das contas (busca por nome, município, UF e código TRI7)."""
+    return get_directory(accounts, 'name', ACCOUNT_SEARCH_FIELDS)
+
+def user_directory(users: List[Dict]) -> Directory:
+    """Índice dos usuários de uma conta (busca por nome e email)."""
+    return get_directory(users, 'full_name', USER_SEARCH_FIELDS)
+
+_combined_users: "OrderedDict[tuple, Tuple[List[List[Dict]], List[Dict]]]" = OrderedDict()
+
+def combined_user_directory(users_by_account: Dict[int, List[Dict]]) -> Directory:
+    """Índice invertido dos usuários de várias contas (busca global por nome e email).
+
+    A lista unificada (cada usuário com seu 'account_id') só é remontada quando a lista de
+    alguma conta muda; as listas vêm do cache da API e mantêm a identidade até serem trocadas.
+    """
+    items = sorted(users_by_account.items())
+    key = tuple((account_id, id(users)) for account_id, users in items)
+    with _directories_lock:
+        entry = _combined_users.get(key)
+        if entry is not None: _combined_users.move_to_end(key)
+    if entry is None:
+        merged = [user if user.get('account_id') == account_id else {**user, 'account_id': account_id}
+                  for account_id, users in items for user in users or []]
+        entry = ([users for _, users in items], merged)  # Guarda as listas de origem para os id() não serem reaproveitados
+        with _directories_lock:
+            _combined_users[key] = entry
+            while len(_combined_users) > COMBINED_CACHE_SIZE: _combined_users.popitem(last=False)
+    return user_directory(entry[1])
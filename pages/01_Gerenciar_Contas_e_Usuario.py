@@ -7,8 +7,11 @@ from typing import List, Dict, Optional
 # Importa todas as funções do módulo compartilhado
 from shared_funcs import (
     get_all_accounts, get_users_for_account, create_new_account, 
-    set_account_status, set_user_status, regenerate_api_key, create_new_user
+    set_account_status, set_user_status, regenerate_api_key, create_new_user,
+    render_api_metrics_panel
 )
+from directory import account_directory, user_directory
+from bulk_import import IMPORT_COLUMNS, template_csv, read_import_file, validate_import, run_import, results_to_csv
 
 if not st.session_state.get('is_authenticated'):
     st.stop()
@@ -25,21 +28,22 @@ if st.session_state.new_api_key_info:
 st.header("Gerenciar Contas (Cartórios)")
 accounts = get_all_accounts(API_KEY)
 if accounts:
+    directory = account_directory(accounts)  # Índice montado uma vez por lista de contas
     # FILTRO DE VISIBILIDADE: Apenas contas ativas para a tabela principal
-    df_accounts = pd.DataFrame(accounts)
-    df_accounts_active = df_accounts[df_accounts['is_active'] == True]
     st.subheader("Contas Ativas (Visão Geral)")
     
     display_cols = ['name', 'is_active', 'cidade', 'uf', 'id', 'created_at']
-    st.dataframe(df_accounts_active[display_cols], use_container_width=True, hide_index=True)
+    st.dataframe(pd.DataFrame(directory.active, columns=display_cols), use_container_width=True, hide_index=True)
 
     st.markdown("---")
     st.header("Gerenciamento Detalhado (Ativação/Desativação)")
     # USAMOS A LISTA COMPLETA AQUI para que o admin possa REATIVAR uma conta
-    account_options = {acc['id']: acc['name'] for acc in accounts}
-    selected_account_id = st.selectbox("Selecione uma conta para gerenciar:", options=sorted(account_options.keys(), key=lambda x: account_options[x]), format_func=lambda x: f"{account_options[x]} (ID: {x})")
+    account_query = st.text_input("Buscar conta (nome, município, UF ou código TRI7):", key="account_search")
+    account_matches = directory.search(account_query)
+    if account_query and not account_matches: st.info("Nenhuma conta encontrada para a busca.")
+    selected_account_id = st.selectbox("Selecione uma conta para gerenciar:", options=[acc['id'] for acc in account_matches], format_func=lambda x: f"{directory.label(x)} (ID: {x})")
     
-    selected_account = next((acc for acc in accounts if acc['id'] == selected_account_id), None)
+    selected_account = directory.get(selected_account_id)
     if selected_account:
         st.subheader(f"Ações para a Conta: '{selected_account['name']}'")
         is_active = selected_account.get('is_active', True)
@@ -55,7 +59,7 @@ if accounts:
             st.warning(f"**Atenção:** Você tem certeza que deseja {action_word} a conta '{name}'?")
             if st.button("Sim, confirmar", key="confirm_acc_status"):
                 if set_account_status(acc_id, new_status, API_KEY):
-                    st.success("Status da conta atualizado."); st.cache_data.clear(); st.session_state.confirm_action = None; st.rerun()
+                    st.success("Status da conta atualizado."); st.session_state.confirm_action = None; st.rerun()
                 else: st.session_state.confirm_action = None
             if st.button("Cancelar", key="cancel_acc_status"): st.session_state.confirm_action = None; st.rerun()
 
@@ -66,16 +70,15 @@ if accounts:
         # --- CORREÇÃO DO BUG: O botão de criar usuário foi movido para fora do 'if users:' ---
         
         if users:
+            users_directory = user_directory(users)
             # FILTRO DE VISIBILIDADE: Apenas usuários ativos para a tabela
-            df_users = pd.DataFrame(users)
-            df_users_active = df_users[df_users['is_active'] == True]
-            st.dataframe(df_users_active[['full_name', 'email', 'is_active', 'id']], use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(users_directory.active, columns=['full_name', 'email', 'is_active', 'id']), use_container_width=True, hide_index=True)
 
             # USAMOS A LISTA COMPLETA AQUI para que o admin possa REATIVAR um usuário
-            user_options_full = {user['id']: user['full_name'] for user in users}
-            selected_user_id = st.selectbox("Selecione um usuário para gerenciar:", options=sorted(user_options_full.keys(), key=lambda x: user_options_full[x]), format_func=lambda x: f"{user_options_full[x]} (ID: {x})")
+            user_query = st.text_input("Buscar usuário (nome ou email):", key="user_search") if len(users_directory) > 10 else ""
+            selected_user_id = st.selectbox("Selecione um usuário para gerenciar:", options=[user['id'] for user in users_directory.search(user_query)], format_func=lambda x: f"{users_directory.label(x)} (ID: {x})")
             
-            selected_user = next((user for user in users if user['id'] == selected_user_id), None)
+            selected_user = users_directory.get(selected_user_id)
             if selected_user:
                 is_user_active = selected_user.get('is_active', True)
                 user_action_label = "Desativar" if is_user_active else "Reativar"
@@ -94,7 +97,7 @@ if accounts:
                         st.warning(f"Tem certeza que deseja {action_word} o usuário '{name}'?")
                         if st.button("Sim, confirmar", key="confirm_user_status"):
                             if set_user_status(user_id, new_status, API_KEY):
-                                st.success("Status do usuário atualizado."); st.cache_data.clear(); st.session_state.confirm_action = None; st.rerun()
+                                st.success("Status do usuário atualizado."); st.session_state.confirm_action = None; st.rerun()
                             else: st.session_state.confirm_action = None
                         if st.button("Cancelar", key="cancel_user_status"): st.session_state.confirm_action = None; st.rerun()
                     
@@ -104,7 +107,7 @@ if accounts:
                             new_key = regenerate_api_key(user_id, API_KEY)
                             if new_key:
                                 st.session_state.new_api_key_info = (name, new_key)
-                                st.cache_data.clear(); st.session_state.confirm_action = None; st.rerun()
+                                st.session_state.confirm_action = None; st.rerun()
                             else: st.session_state.confirm_action = None
                         if st.button("Cancelar", key="cancel_regen"): st.session_state.confirm_action = None; st.rerun()
         else:
@@ -116,7 +119,7 @@ if accounts:
                 if st.form_submit_button("Criar Usuário"):
                     if all([full_name, email, password]):
                         response = create_new_user(full_name, email, password, selected_account_id, API_KEY)
-                        if response: st.session_state.new_api_key_info = (response['full_name'], response.get('api_key')); st.cache_data.clear(); st.rerun()
+                        if response: st.session_state.new_api_key_info = (response['full_name'], response.get('api_key')); st.rerun()
                     else: st.warning("Preencha todos os campos.")
 
     with st.expander("➕ Criar Nova Conta"):
@@ -135,5 +138,36 @@ if accounts:
                     uf_clean = uf.upper() if uf else None
                     cod_tri7_clean = int(cod_tri7) if cod_tri7 else None
                     if create_new_account(new_account_name, cod_tri7_clean, cidade_clean, uf_clean, API_KEY): 
-                        st.success(f"Conta '{new_account_name}' criada!"); st.cache_data.clear(); st.rerun()
+                        st.success(f"Conta '{new_account_name}' criada!"); st.rerun()
                 else: st.warning("O nome da conta não pode ser vazio.")
+
+    with st.expander("📥 Importar Contas e Usuários em Lote (CSV/XLSX)", expanded=bool(st.session_state.bulk_import_results)):
+        if st.session_state.bulk_import_results:
+            results = st.session_state.bulk_import_results
+            failed = [r for r in results if r['status'] in ('falhou', 'ignorado')]
+            st.success(f"Importação concluída: {len(results) - len(failed)} de {len(results)} itens criados.")
+            if failed: st.dataframe(pd.DataFrame(failed)[['linha', 'tipo', 'conta', 'email', 'status', 'erro']], use_container_width=True, hide_index=True)
+            st.warning("O arquivo de resultado contém as chaves de API dos novos usuários, que não podem ser consultadas depois. Baixe-o antes de dispensar.")
+            st.download_button("⬇️ Baixar resultado (IDs e chaves de API)", data=results_to_csv(results), file_name="resultado_importacao.csv", mime="text/csv")
+            if st.button("Dispensar resultado"): st.session_state.bulk_import_results = None; st.rerun()
+        else:
+            st.caption("Uma linha por usuário; linhas sem usuário só criam a conta. Contas com o mesmo nome de uma existente recebem os usuários nela.")
+            st.dataframe(pd.DataFrame({'Coluna': list(IMPORT_COLUMNS), 'Conteúdo': list(IMPORT_COLUMNS.values())}), use_container_width=True, hide_index=True)
+            st.download_button("Baixar modelo (CSV)", data=template_csv(), file_name="modelo_importacao.csv", mime="text/csv")
+            uploaded = st.file_uploader("Arquivo de importação", type=["csv", "xlsx"])
+            if uploaded is not None:
+                try: plan, errors = validate_import(read_import_file(uploaded.name, uploaded.getvalue()), accounts)
+                except Exception as e: plan, errors = None, [f"Não foi possível ler o arquivo: {e}"]
+                if errors:
+                    st.error(f"O arquivo tem {len(errors)} problema(s); corrija e envie novamente. Nada foi criado.")
+                    st.dataframe(pd.DataFrame({'Problema': errors}), use_container_width=True, hide_index=True)
+                else:
+                    new_accounts = sum(acc['existing_id'] is None for acc in plan['accounts'])
+                    st.info(f"Arquivo válido: {new_accounts} conta(s) nova(s), {len(plan['accounts']) - new_accounts} existente(s) e {len(plan['users'])} usuário(s) a criar.")
+                    if st.button("Importar", type="primary"):
+                        progress = st.progress(0.0, text="Importando...")
+                        results = run_import(plan, API_KEY, on_progress=lambda done, total: progress.progress(done / total, text=f"Importando... {done}/{total}"))
+                        progress.empty()
+                        st.session_state.bulk_import_results = results; st.rerun()
+
+render_api_metrics_panel()
@@ -2,7 +2,8 @@
 
 import streamlit as st
 import pandas as pd
-from shared_funcs import get_all_prompts, create_new_prompt, update_prompt_details, delete_prompt
+from shared_funcs import get_prompt_summaries, get_prompt_text, create_new_prompt, update_prompt_details, delete_prompt, render_api_metrics_panel
+from directory import get_directory
 
 if not st.session_state.get('is_authenticated'):
     st.stop()
@@ -10,33 +11,36 @@ if not st.session_state.get('is_authenticated'):
 API_KEY = st.session_state.api_key
 
 st.header("Gerenciar Prompts")
-prompts = get_all_prompts(API_KEY)
+# Lista leve (id, nome, hash); o texto só é buscado quando um prompt é selecionado
+prompts = get_prompt_summaries(API_KEY)
 if prompts:
     # Ordena por ID crescente, como solicitado
     df_prompts = pd.DataFrame(prompts).sort_values(by='id', ascending=True)
     st.dataframe(df_prompts[['id', 'name']], use_container_width=True, hide_index=True)
     
-    prompt_options = {p['id']: p['name'] for p in prompts}
+    prompt_directory = get_directory(prompts)  # Índice montado uma vez por lista de prompts
     # Ordena as opções do selectbox por ID, que é o campo mais estável
     selected_prompt_id = st.selectbox("Selecione um prompt para editar ou deletar:", 
-                                      options=sorted(prompt_options.keys(), key=lambda x: x), 
-                                      format_func=lambda x: f"{prompt_options[x]} (ID: {x})")
+                                      options=sorted(prompt_directory.by_id), 
+                                      format_func=lambda x: f"{prompt_directory.label(x)} (ID: {x})",
+                                      index=None, placeholder="Escolha um prompt...")
     
-    selected_prompt = next((p for p in prompts if p['id'] == selected_prompt_id), None)
+    selected_prompt = prompt_directory.get(selected_prompt_id)
+    selected_prompt_text = get_prompt_text(selected_prompt_id, selected_prompt['content_hash'], API_KEY) if selected_prompt else None
     
-    if selected_prompt:
+    if selected_prompt and selected_prompt_text is not None:
         st.markdown("---")
         st.subheader(f"Editar Prompt: {selected_prompt['name']}")
         
         # O formulário de edição só aparece após a seleção
         with st.form("edit_prompt_form"):
             edited_name = st.text_input("Nome do Prompt", value=selected_prompt['name'])
-            edited_text = st.text_area("Texto do Prompt", value=selected_prompt['prompt_text'], height=300)
+            edited_text = st.text_area("Texto do Prompt", value=selected_prompt_text, height=300)
             
             col1, col2 = st.columns(2)
             if col1.form_submit_button("Salvar Alterações", use_container_width=True):
                 if update_prompt_details(selected_prompt_id, edited_name, edited_text, API_KEY):
-                    st.success("Prompt atualizado!"); get_all_prompts.clear(); st.rerun()
+                    st.success("Prompt atualizado!"); st.rerun()
             if col2.form_submit_button("Deletar Prompt", use_container_width=True):
                 st.session_state.confirm_action = ("delete_prompt", selected_prompt_id, selected_prompt['name'])
         
@@ -46,7 +50,7 @@ if prompts:
             st.warning(f"**Atenção:** Você tem certeza que deseja DELETAR o prompt '{name}'? Esta ação não pode ser desfeita.")
             if st.button("Sim, DELETAR", key="confirm_delete"):
                 if delete_prompt(prompt_id, API_KEY): 
-                    st.success("Prompt deletado."); get_all_prompts.clear(); st.session_state.confirm_action = None; st.rerun()
+                    st.success("Prompt deletado."); st.session_state.confirm_action = None; st.rerun()
             if st.button("Cancelar", key="cancel_delete"): st.session_state.confirm_action = None; st.rerun()
 
 with st.expander("➕ Criar Novo Prompt"):
@@ -56,5 +60,7 @@ with st.expander("➕ Criar Novo Prompt"):
         if st.form_submit_button("Criar Prompt"):
             if new_prompt_name and new_prompt_text:
                 if create_new_prompt(new_prompt_name, new_prompt_text, API_KEY): 
-                    st.success("Novo prompt criado!"); get_all_prompts.clear(); st.rerun()
+                    st.success("Novo prompt criado!"); st.rerun()
             else: st.warning("Preencha o nome e o texto do prompt.")
+
+render_api_metrics_panel()
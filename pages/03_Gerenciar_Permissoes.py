@@ -2,8 +2,9 @@
 
 import streamlit as st
 import pandas as pd
-from shared_funcs import get_all_accounts, get_all_prompts
-from shared_funcs import get_account_permissions, sync_account_permissions
+from shared_funcs import get_all_accounts, get_prompt_summaries, render_api_metrics_panel
+from shared_funcs import get_account_permissions, sync_account_permissions, load_permissions_matrix, sync_permissions_bulk
+from directory import account_directory, get_directory
 
 if not st.session_state.get('is_authenticated'):
     st.stop()
@@ -14,56 +15,120 @@ st.header("Gerenciar Permissões por Conta")
 st.info("Após selecionar os prompts que o cartório vai usar, sempre salve as permissões.")
 
 accounts = get_all_accounts(API_KEY)
-prompts = get_all_prompts(API_KEY)
+prompts = get_prompt_summaries(API_KEY)  # Só id e nome: o texto dos prompts não é necessário aqui
 
 if accounts and prompts:
     # --- FILTRO ADICIONADO AQUI ---
     # 1. Filtra a lista para incluir apenas as contas ativas
-    active_accounts = [acc for acc in accounts if acc.get('is_active', True)]
+    directory = account_directory(accounts)  # Índice montado uma vez por lista de contas
+    active_accounts = directory.active
     
     # 2. Cria as opções do selectbox usando APENAS a lista de contas ativas
-    account_options = {acc['id']: acc['name'] for acc in active_accounts}
+    account_options = [acc['id'] for acc in active_accounts]  # Já em ordem de nome
     # --- FIM DO FILTRO ---
     
     if not account_options:
         st.info("Não há contas ativas para gerenciar permissões.")
         st.stop()
         
-    # 3. O selectbox agora é populado apenas com contas ativas
-    selected_account_id_perm = st.selectbox("Selecione a conta para gerenciar:", 
-                                            options=sorted(account_options.keys(), key=lambda x: account_options[x]), 
-                                            format_func=lambda x: account_options[x], 
-                                            key="perm_account_select")
+    mode = st.radio("Modo de edição:", ["Por conta", "Matriz (várias contas)"], horizontal=True, key="perm_mode")
+    if mode == "Por conta":
+        # 3. O selectbox agora é populado apenas com contas ativas
+        selected_account_id_perm = st.selectbox("Selecione a conta para gerenciar:", 
+                                                options=account_options, 
+                                                format_func=directory.label, 
+                                                key="perm_account_select")
     
-    # O restante do código permanece exatamente o mesmo, pois ele já está correto.
+        # O restante do código permanece exatamente o mesmo, pois ele já está correto.
     
-    # Lógica para forçar a limpeza do cache de permissões ao mudar a conta (Bugfix)
-    if selected_account_id_perm != st.session_state.get('last_perm_account_id'):
-        get_account_permissions.clear()
-        st.session_state.last_perm_account_id = selected_account_id_perm
+        # O cache de permissões é por conta e atualizado ao salvar: trocar de conta não precisa limpá-lo
     
-    if selected_account_id_perm:
-        st.subheader(f"Configurando Prompts para: {account_options[selected_account_id_perm]}")
-        current_permissions = get_account_permissions(selected_account_id_perm, API_KEY)
+        if selected_account_id_perm:
+            st.subheader(f"Configurando Prompts para: {directory.label(selected_account_id_perm)}")
+            current_permissions = get_account_permissions(selected_account_id_perm, API_KEY)
         
-        # Layout de Checkboxes em Colunas (Melhor UX)
-        num_columns = 4
-        cols = st.columns(num_columns)
-        all_prompt_ids = sorted(prompts, key=lambda p: p['id']) # Ordena por ID
+            # Layout de Checkboxes em Colunas (Melhor UX)
+            num_columns = 4
+            cols = st.columns(num_columns)
+            all_prompt_ids = sorted(prompts, key=lambda p: p['id']) # Ordena por ID
         
-        new_permissions = []
+            new_permissions = []
         
-        st.write("Marque os prompts que a conta deve ter acesso:")
-        with st.form("perm_form"):
-            for i, prompt in enumerate(all_prompt_ids):
-                # CHAVE ÚNICA E SÓLIDA
-                is_checked = cols[i % num_columns].checkbox(f"{prompt['name']} (ID: {prompt['id']})", 
-                                                            value=(prompt['id'] in current_permissions), 
-                                                            key=f"perm_{selected_account_id_perm}_{prompt['id']}")
-                if is_checked: new_permissions.append(prompt['id'])
+            st.write("Marque os prompts que a conta deve ter acesso:")
+            with st.form("perm_form"):
+                for i, prompt in enumerate(all_prompt_ids):
+                    # CHAVE ÚNICA E SÓLIDA
+                    is_checked = cols[i % num_columns].checkbox(f"{prompt['name']} (ID: {prompt['id']})", 
+                                                                value=(prompt['id'] in current_permissions), 
+                                                                key=f"perm_{selected_account_id_perm}_{prompt['id']}")
+                    if is_checked: new_permissions.append(prompt['id'])
             
-            st.markdown("---")
-            if st.form_submit_button("Salvar Permissões", use_container_width=True):
-                if sync_account_permissions(selected_account_id_perm, new_permissions, API_KEY):
-                    st.success("Permissões atualizadas com sucesso!"); st.rerun()
+                st.markdown("---")
+                if st.form_submit_button("Salvar Permissões", use_container_width=True):
+                    if sync_account_permissions(selected_account_id_perm, new_permissions, API_KEY):
+                        st.success("Permissões atualizadas com sucesso!"); st.rerun()
 
+    else:
+        # --- MODO MATRIZ: contas nas linhas, prompts nas colunas ---
+        if st.session_state.get('perm_bulk_results'):
+            results = st.session_state.perm_bulk_results
+            failed = {acc_id: error for acc_id, error in results.items() if error}
+            if failed: st.error(f"{len(failed)} de {len(results)} contas não foram salvas.")
+            else: st.success(f"Permissões de {len(results)} contas atualizadas com sucesso!")
+            st.dataframe(pd.DataFrame([{"Conta": directory.label(acc_id), "Resultado": f"✖ {error}" if error else "✔ Salvo"} for acc_id, error in results.items()]), use_container_width=True, hide_index=True)
+            st.session_state.perm_bulk_results = None
+
+        name_filter = st.text_input("Filtrar contas (nome, município, UF ou código TRI7):", key="perm_matrix_filter")
+        matrix_account_ids = [acc['id'] for acc in directory.search(name_filter, active=True)]
+        all_prompt_ids = sorted(prompts, key=lambda p: p['id'])
+        prompt_directory = get_directory(prompts)
+        visible_prompt_ids = {p['id'] for p in all_prompt_ids}
+
+        progress_bar = st.progress(0.0, text="Carregando permissões...")
+        matrix, load_errors, stale_accounts = load_permissions_matrix(matrix_account_ids, API_KEY, on_progress=lambda done, total: progress_bar.progress(done / total, text=f"Carregando permissões: {done}/{total} contas"))
+        progress_bar.empty()
+        if load_errors: st.warning(f"Não foi possível carregar as permissões de {len(load_errors)} conta(s); elas ficaram fora da matriz.")
+        if stale_accounts: st.warning(f"⚠️ Gateway indisponível: as permissões de {len(stale_accounts)} conta(s) são as últimas guardadas e podem estar desatualizadas.")
+        matrix_account_ids = [acc_id for acc_id in matrix_account_ids if acc_id in matrix]
+
+        def apply_changes(changes):
+            """Envia só as contas alteradas, em paralelo, e guarda o resultado por conta para o próximo rerun."""
+            if not changes: st.info("Nenhuma alteração para salvar."); return
+            save_bar = st.progress(0.0, text="Salvando permissões...")
+            st.session_state.perm_bulk_results = sync_permissions_bulk(changes, API_KEY, on_progress=lambda done, total: save_bar.progress(done / total, text=f"Salvando: {done}/{total} contas"))
+            st.session_state.pop("perm_matrix_editor", None)
+            st.rerun()
+
+        def merged_permissions(acc_id, checked_ids):
+            # Mantém permissões de prompts que não aparecem na matriz
+            return sorted((set(matrix[acc_id]) - visible_prompt_ids) | set(checked_ids))
+
+        # Ação em lote: conceder/remover um prompt de todas as contas listadas
+        with st.form("perm_bulk_form"):
+            col1, col2 = st.columns([3, 1])
+            bulk_prompt_id = col1.selectbox("Prompt:", options=[p['id'] for p in all_prompt_ids], format_func=lambda x: f"{prompt_directory.label(x)} (ID: {x})")
+            bulk_action = col2.radio("Ação:", ["Conceder", "Remover"], horizontal=True)
+            if st.form_submit_button(f"Aplicar às {len(matrix_account_ids)} contas listadas", use_container_width=True):
+                changes = {}
+                for acc_id in matrix_account_ids:
+                    current = set(matrix[acc_id])
+                    new = current | {bulk_prompt_id} if bulk_action == "Conceder" else current - {bulk_prompt_id}
+                    if new != current: changes[acc_id] = sorted(new)
+                apply_changes(changes)
+
+        # Edição célula a célula
+        df_matrix = pd.DataFrame(
+            [{"Conta": directory.label(acc_id), **{str(p['id']): p['id'] in matrix[acc_id] for p in all_prompt_ids}} for acc_id in matrix_account_ids],
+            index=matrix_account_ids, columns=["Conta"] + [str(p['id']) for p in all_prompt_ids])
+        column_config = {str(p['id']): st.column_config.CheckboxColumn(p['name'], help=f"ID: {p['id']}") for p in all_prompt_ids}
+        edited_matrix = st.data_editor(df_matrix, disabled=["Conta"], column_config=column_config, hide_index=True, use_container_width=True, key="perm_matrix_editor")
+
+        changes = {}
+        for acc_id in matrix_account_ids:
+            checked_ids = [p['id'] for p in all_prompt_ids if edited_matrix.at[acc_id, str(p['id'])]]
+            new_permissions = merged_permissions(acc_id, checked_ids)
+            if set(new_permissions) != set(matrix[acc_id]): changes[acc_id] = new_permissions
+        if st.button(f"Salvar Alterações da Matriz ({len(changes)} contas)", use_container_width=True, disabled=not changes):
+            apply_changes(changes)
+
+render_api_metrics_panel()
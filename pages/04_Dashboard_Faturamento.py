@@ -1,23 +1,26 @@
 # pages/4_Dashboard_Faturamento.py (ALTERAÇÃO MÍNIMA PARA NOMES AMIGÁVEIS)
 
 import streamlit as st
-import pandas as pd
-import io
+import os
+import time
 from datetime import date, timedelta
 from decimal import Decimal
-from shared_funcs import get_all_accounts, get_master_billing_report, get_detailed_billing_jobs
+from shared_funcs import get_all_accounts, render_api_metrics_panel
+from directory import account_directory
+from report_jobs import report_executor, ACTIVE_STATUSES
 
 if not st.session_state.get('is_authenticated'):
     st.stop()
 
 API_KEY = st.session_state.api_key
+TREND_SPLITS = {"Nada": None, "Modelo": 'model_display_name', "Cartório": 'account_name'}
 
 st.header("Dashboard de Faturamento")
 accounts = get_all_accounts(API_KEY)
 if accounts:
     with st.form("billing_form"):
         account_options_billing = {"Todas as Contas (Resumo)": None}
-        account_options_billing.update({acc['name']: acc['id'] for acc in accounts})
+        account_options_billing.update({acc['name']: acc['id'] for acc in account_directory(accounts).ordered})
         selected_account_name = st.selectbox("Selecione a Conta:", options=account_options_billing.keys())
         
         today = date.today()
@@ -25,6 +28,8 @@ if accounts:
         col1, col2 = st.columns(2)
         start_date = col1.date_input("Data de Início", value=default_start)
         end_date = col2.date_input("Data de Fim", value=today)
+        # O resumo é calculado a partir dos jobs; a conferência com o servidor custa uma chamada a mais
+        verify_summary = st.checkbox("Conferir resumo com o servidor", value=False)
         
         submitted = st.form_submit_button("Gerar Relatório", use_container_width=True)
     
@@ -33,80 +38,124 @@ if accounts:
         report_id = selected_account_id_billing 
         
         if start_date and end_date:
-            with st.spinner("Gerando relatório..."):
-                detailed_jobs = get_detailed_billing_jobs(str(start_date), str(end_date), report_id, API_KEY)
-                summary_report = get_master_billing_report(str(start_date), str(end_date), report_id, API_KEY)
+            # O relatório roda em segundo plano; o mesmo período/conta já em andamento é reaproveitado
+            job = report_executor.submit(str(start_date), str(end_date), report_id, selected_account_name, API_KEY, include_summary=verify_summary)
+            st.session_state.billing_report_job = job.id
 
-            if detailed_jobs and summary_report and summary_report.get('by_model'):
-                st.session_state['billing_report_data'] = {
-                    'summary': summary_report,
-                    'jobs_breakdown': detailed_jobs,
-                    'period': summary_report.get('period', {})
-                }
-            else:
-                st.info("Nenhum dado de faturamento encontrado para o período e conta selecionados.")
-                st.session_state.billing_report_data = None
+    STATUS_ICONS = {'queued': "⏳", 'running': "🔄", 'done': "✅", 'failed': "❌"}
 
-    if st.session_state.billing_report_data:
-        report_data = st.session_state.billing_report_data
-        summary = report_data['summary'].get('summary', {})
-        by_model = report_data['summary'].get('by_model', [])
-        
-        st.subheader(f"Resumo do Período para: {selected_account_name}")
-        col_resumo1, col_resumo2 = st.columns(2)
-        col_resumo1.metric(label="Total de Jobs Processados", value=f"{summary.get('total_jobs', 0):,}")
-        col_resumo2.metric(label="Total de Tokens Consumidos", value=f"{summary.get('total_tokens', 0):,}")
+    @st.fragment(run_every=1.0)
+    def wait_for(job_id: str, export_format=None):
+        """Mostra o andamento e, quando o relatório (ou a exportação) termina, redesenha a página inteira."""
+        job = report_executor.get(job_id, API_KEY)
+        if job is None: return
+        if export_format is None and job.status in ACTIVE_STATUSES:
+            done, total = job.progress
+            st.progress(done / total if total else 0.0, text=f"{job.stage}: {done}/{total} períodos" if total else f"{job.stage}...")
+        elif export_format is not None and job.exports.get(export_format, {}).get('status') == 'running':
+            st.progress(1.0, text="Gerando arquivo...")
+        else:
+            st.rerun()
 
-        if by_model:
-            st.subheader("Consumo Detalhado por Modelo")
-            df_report = pd.DataFrame(by_model)
-            
-            # --- ADICIONADO: MAPA DE TRADUÇÃO DE NOMES ---
-            model_name_map = {
-                "gemini-2.5-flash-lite": "Modelo Ultra",
-                "gemini-2.5-flash": "Modelo Fast",
-                "gemini-2.5-pro": "Modelo Pro",
-            }
-            # Substitui os nomes técnicos pelos amigáveis, mantendo o original se não houver mapa
-            df_report['model'] = df_report['model'].map(model_name_map).fillna(df_report['model'])
-            # Renomeia a coluna para uma melhor exibição
-            df_report = df_report.rename(columns={'model': 'Modelo'})
-            # --- FIM DA ADIÇÃO ---
-            
-            st.dataframe(df_report, use_container_width=True, hide_index=True)
+    report_jobs = report_executor.jobs_for(API_KEY)
+    if report_jobs:
+        job_ids = [job.id for job in report_jobs]
+        jobs_by_id = {job.id: job for job in report_jobs}
+        current_job_id = st.session_state.billing_report_job if st.session_state.billing_report_job in jobs_by_id else job_ids[0]
+        # O rótulo não inclui o status, que muda durante a execução (o widget perderia a seleção)
+        selected_job_id = st.radio("Relatórios:", options=job_ids, index=job_ids.index(current_job_id),
+                                   format_func=lambda job_id: f"{jobs_by_id[job_id].describe()} (pedido às {time.strftime('%H:%M:%S', time.localtime(jobs_by_id[job_id].submitted_at))})")
+        st.session_state.billing_report_job = selected_job_id
+        report_job = jobs_by_id[selected_job_id]
+        st.caption(" · ".join(f"{STATUS_ICONS[job.status]} {job.describe()}" for job in report_jobs))
 
-        st.markdown("---")
-        st.subheader("Exportar Relatório Detalhado")
-        
-        # --- LÓGICA DE EXPORTAÇÃO (sem alterações) ---
-        df_jobs = pd.DataFrame(report_data['jobs_breakdown'])
+        if report_job.status in ACTIVE_STATUSES:
+            st.info("O relatório está sendo gerado em segundo plano. Você pode sair desta página e voltar depois.")
+            wait_for(report_job.id)
+        elif report_job.status == 'failed':
+            st.error(f"Falha ao gerar relatório. Detalhe: {report_job.error}")
+            if st.button("Remover relatório"): report_executor.discard(report_job); st.rerun()
+        elif report_job.result is None:
+            st.info("Este relatório não está mais disponível. Gere-o novamente.")
+        else:
+            # Tabelas e exportação só são importadas quando há um relatório pronto para mostrar
+            import pandas as pd
+            from billing_analytics import pivot_jobs, trend_series, model_label, GROUP_COLUMNS, TREND_METRICS
+            from billing_export import EXPORT_FORMATS, XLSX_MAX_ROWS
+            report_data = report_job.result
+            footprint = report_data['footprint']
+            st.caption(f"{len(report_data['jobs_df']):,} jobs carregados — memória: {footprint['raw_mb']:,.1f} MB (JSON) → {footprint['frame_mb']:,.1f} MB (tabela); consolidado diário com {len(report_data['rollup']):,} linhas")
+            if report_data['divergences']: st.warning("Resumo local diverge do servidor: " + "; ".join(report_data['divergences']))
+            elif report_data['divergences'] is not None:
+                unmatched = report_data['unmatched_models']
+                if unmatched: st.caption(f"✔ Resumo local conferido com o servidor (totais e modelos com nome correspondente; sem correspondência: {', '.join(unmatched)}).")
+                else: st.caption("✔ Resumo local conferido com o servidor (totais e por modelo).")
+            if not len(report_data['jobs_df']):
+                st.info("Nenhum dado de faturamento encontrado para o período e conta selecionados.")
+            else:
+                summary = report_data['summary'].get('summary', {})
+                by_model = report_data['summary'].get('by_model', [])
+                
+                st.subheader(f"Resumo do Período para: {report_job.account_label}")
+                col_resumo1, col_resumo2 = st.columns(2)
+                col_resumo1.metric(label="Total de Jobs Processados", value=f"{summary.get('total_jobs', 0):,}")
+                col_resumo2.metric(label="Total de Tokens Consumidos", value=f"{summary.get('total_tokens', 0):,}")
 
-        df_jobs = df_jobs.rename(columns={
-            'created_at': 'Data', 
-            'account_name': 'Cartório', 
-            'user_name': 'Usuário', 
-            'job_id': 'ID do Job', 
-            'prompt_name': 'Prompt', 
-            'model_display_name': 'Modelo', 
-            'cost_brl': 'Custo (R$)',
-            'total_tokens': 'Tokens Brutos'
-        })
+                if by_model:
+                    st.subheader("Consumo Detalhado por Modelo")
+                    df_report = pd.DataFrame(by_model)
+                    
+                    # --- ADICIONADO: MAPA DE TRADUÇÃO DE NOMES ---
+                    # Substitui os nomes técnicos pelos amigáveis, mantendo o original se não houver mapa
+                    df_report['model'] = df_report['model'].map(model_label)
+                    # Renomeia a coluna para uma melhor exibição
+                    df_report = df_report.rename(columns={'model': 'Modelo'})
+                    # --- FIM DA ADIÇÃO ---
+                    
+                    st.dataframe(df_report, use_container_width=True, hide_index=True)
 
-        df_jobs['Data'] = pd.to_datetime(df_jobs['Data']).dt.strftime('%d/%m/%Y %H:%M:%S')
-        df_jobs['Custo (R$)'] = df_jobs['Custo (R$)'].astype(float).round(8)
+                # Tendências a partir do consolidado diário do relatório: filtros e reruns não passam pelos jobs
+                rollup = report_data['rollup']
+                st.subheader("Tendências")
+                col_metric, col_split = st.columns(2)
+                metric_label = col_metric.radio("Métrica:", options=list(TREND_METRICS), horizontal=True)
+                split_label = col_split.radio("Separar por:", options=list(TREND_SPLITS), horizontal=True)
+                col_models, col_accounts = st.columns(2)
+                trend_models = col_models.multiselect("Modelos:", options=sorted(rollup['model_display_name'].dropna().unique()),
+                                                      format_func=model_label, placeholder="Todos")
+                trend_accounts = col_accounts.multiselect("Cartórios:", options=sorted(rollup['account_name'].dropna().unique()), placeholder="Todos")
+                series, bucket_name = trend_series(rollup, TREND_METRICS[metric_label], report_job.start_date, report_job.end_date,
+                                                   trend_models, trend_accounts, TREND_SPLITS[split_label])
+                if split_label == "Modelo": series = series.rename(columns=model_label)
+                st.caption(f"Um ponto por {bucket_name} ({len(series)} pontos no período).")
+                st.line_chart(series, x_label=bucket_name.capitalize(), y_label=metric_label)
 
-        final_columns = ['Data', 'Cartório', 'Usuário', 'ID do Job', 'Prompt', 'Modelo', 'Custo (R$)', 'Tokens Brutos']
-        df_export = df_jobs.reindex(columns=final_columns)
-        
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_export.to_excel(writer, index=False, sheet_name='RelatorioFaturamento')
-            worksheet = writer.sheets['RelatorioFaturamento']
-            for i, col in enumerate(df_export.columns):
-                column_len = max(df_export[col].astype(str).str.len().max(), len(col)) + 2
-                worksheet.set_column(i, i, column_len)
-        
-        period_str = report_data['period']
-        file_name_str = f"relatorio_detalhado_{period_str['start']}_a_{period_str['end']}.xlsx"
+                # Detalhamento calculado localmente a partir dos jobs já baixados (sem novas chamadas à API);
+                # agrupamentos só por dia, cartório e/ou modelo saem do consolidado diário
+                st.subheader("Detalhamento")
+                group_labels = st.multiselect("Agrupar por:", options=list(GROUP_COLUMNS), default=["Cartório"])
+                if group_labels:
+                    st.dataframe(pivot_jobs(report_data['jobs_df'], group_labels, rollup), use_container_width=True, hide_index=True)
+
+                st.markdown("---")
+                st.subheader("Exportar Relatório Detalhado")
+                
+                # --- LÓGICA DE EXPORTAÇÃO (arquivo gerado em segundo plano, em disco e com memória constante) ---
+                export_format = st.radio("Formato do arquivo:", options=list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][3], horizontal=True)
+                if export_format == 'xlsx' and len(report_data['jobs_df']) >= XLSX_MAX_ROWS:
+                    st.caption(f"O Excel aceita até {XLSX_MAX_ROWS - 1:,} linhas por aba: o relatório será dividido em várias abas. Para uma tabela única, use CSV ou Parquet.")
+                if st.button("Preparar arquivo para download", use_container_width=True):
+                    report_executor.export(report_job, export_format)
+
+                export = report_job.exports.get(export_format)
+                if export and export['status'] == 'running':
+                    wait_for(report_job.id, export_format)
+                elif export and export['status'] == 'failed':
+                    st.error(f"Falha ao gerar o arquivo: {export['error']}")
+                elif export and export['status'] == 'done' and os.path.exists(export['path']):
+                    _, extension, mime, label = EXPORT_FORMATS[export_format]
+                    file_name_str = f"relatorio_detalhado_{report_job.start_date}_a_{report_job.end_date}.{extension}"
+                    with open(export['path'], 'rb') as export_file:
+                        st.download_button(label=f"📥 Baixar Relatório Detalhado ({label})", data=export_file, file_name=file_name_str, mime=mime, use_container_width=True)
 
-        st.download_button(label="📥 Baixar Relatório Detalhado (.xlsx)", data=output.getvalue(), file_name=file_name_str, mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+render_api_metrics_panel()
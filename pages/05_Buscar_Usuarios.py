@@ -0,0 +1,46 @@
+# pages/5_Buscar_Usuarios.py (BUSCA DE USUÁRIOS EM TODAS AS CONTAS)
+
+import streamlit as st
+from shared_funcs import get_all_accounts, load_users_index, render_api_metrics_panel
+from directory import account_directory, combined_user_directory
+
+if not st.session_state.get('is_authenticated'):
+    st.stop()
+
+API_KEY = st.session_state.api_key
+MAX_RESULTS = 200
+
+st.header("Buscar Usuários (Todas as Contas)")
+st.caption("Encontre a conta de um usuário pelo nome ou email. Para regenerar a chave ou desativar o usuário, use a página de contas.")
+
+accounts = get_all_accounts(API_KEY)
+if accounts:
+    directory = account_directory(accounts)
+    # Só as contas com usuários vencidos no cache são buscadas de novo (em paralelo)
+    progress_bar = st.progress(0.0, text="Carregando usuários...")
+    users_by_account, load_errors, refreshed, stale_accounts = load_users_index(directory.ids, API_KEY, on_progress=lambda done, total: progress_bar.progress(done / total, text=f"Carregando usuários: {done}/{total} contas"))
+    progress_bar.empty()
+    if load_errors: st.warning(f"Não foi possível carregar os usuários de {len(load_errors)} conta(s); eles ficaram fora da busca.")
+    if stale_accounts: st.warning(f"⚠️ Gateway indisponível: os usuários de {len(stale_accounts)} conta(s) são os últimos guardados e podem estar desatualizados.")
+
+    users_directory = combined_user_directory(users_by_account)
+    st.caption(f"{len(users_directory):,} usuários em {len(users_by_account):,} contas ({refreshed:,} atualizadas agora).")
+
+    query = st.text_input("Nome ou email do usuário:", key="global_user_search")
+    if query:
+        matches = users_directory.search(query)
+        if not matches:
+            st.info("Nenhum usuário encontrado.")
+        else:
+            if len(matches) > MAX_RESULTS: st.caption(f"Mostrando os primeiros {MAX_RESULTS} de {len(matches):,} resultados; refine a busca.")
+            import pandas as pd  # Só quando há resultados para mostrar
+            rows = []
+            for user in matches[:MAX_RESULTS]:
+                account = directory.get(user['account_id']) or {}
+                rows.append({
+                    "Usuário": user.get('full_name'), "Email": user.get('email'), "Usuário ativo": user.get('is_active', True), "ID do usuário": user['id'],
+                    "Conta": account.get('name', user['account_id']), "Conta ativa": account.get('is_active', True), "ID da conta": user['account_id'],
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+render_api_metrics_panel()
@@ -0,0 +1,156 @@
+# report_jobs.py (RELATÓRIOS DE FATURAMENTO EM SEGUNDO PLANO, FORA DO RERUN DO STREAMLIT)
+#
+# A busca, a agregação e a exportação rodam em threads do processo; o dashboard só enfileira,
+# consulta o andamento e baixa os arquivos prontos. Os relatórios ficam num armazenamento
+# limitado (quantidade e idade) compartilhado pelas sessões da mesma credencial, então
+# sobrevivem à troca de página e dois relatórios podem rodar ao mesmo tempo.
+# pandas e xlsxwriter (billing_analytics/billing_export) só são importados na thread do
+# primeiro relatório ou exportação, não quando o dashboard é aberto.
+
+import os
+import time
+import uuid
+import threading
+import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import api_metrics
+from shared_funcs import load_billing_report, credential_scope, api_error_detail
+
+# --- CONFIGURAÇÃO ---
+REPORT_MAX_WORKERS = 2  # Relatórios/exportações executados ao mesmo tempo
+REPORT_MAX_JOBS = 8  # Relatórios guardados (os mais antigos já terminados saem primeiro)
+REPORT_JOB_TTL = 2 * 3600  # Segundos que um relatório terminado fica disponível
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+class ReportJob:
+    """Um relatório: parâmetros, andamento, resultado (tabela e resumos) e arquivos exportados.
+
+    Só a thread do executor altera o job; as páginas apenas leem os atributos.
+    """
+
+    def __init__(self, scope: str, start_date: str, end_date: str, account_id: Optional[int], account_label: str, include_summary: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.scope = scope
+        self.start_date, self.end_date, self.account_id = start_date, end_date, account_id
+        self.account_label = account_label
+        self.include_summary = include_summary
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.stage = "Na fila"
+        self.progress: Tuple[int, int] = (0, 0)
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None  # 'jobs_df', 'rollup', 'summary', 'footprint', 'divergences', 'unmatched_models'
+        self.exports: Dict[str, Dict[str, Any]] = {}  # formato -> {'status', 'path', 'error'}
+
+    @property
+    def key(self) -> tuple:
+        return (self.scope, self.start_date, self.end_date, self.account_id, self.include_summary)
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES or any(export['status'] == 'running' for export in self.exports.values())
+
+    def describe(self) -> str:
+        return f"{self.account_label} — {self.start_date} a {self.end_date}"
+
+class ReportExecutor:
+    """Fila de relatórios com armazenamento limitado; submissões repetidas reaproveitam o relatório em andamento."""
+
+    def __init__(self, max_workers: int = REPORT_MAX_WORKERS, max_jobs: int = REPORT_MAX_JOBS, ttl: float = REPORT_JOB_TTL):
+        self.max_jobs, self.ttl = max_jobs, ttl
+        self._jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+
+    def submit(self, start_date: str, end_date: str, account_id: Optional[int], account_label: str,
+               api_key: str, include_summary: bool = False) -> ReportJob:
+        """Enfileira o relatório, ou devolve o que já está na fila/rodando para o mesmo período e conta."""
+        job = ReportJob(credential_scope(api_key), start_date, end_date, account_id, account_label, include_summary)
+        with self._lock:
+            running = next((j for j in self._jobs.values() if j.key == job.key and j.status in ACTIVE_STATUSES), None)
+            if running is not None: return running
+            self._jobs[job.id] = job
+            self._evict()
+        self._pool.submit(api_metrics.propagate(self._run), job, api_key)
+        return job
+
+    def export(self, job: ReportJob, fmt: str) -> Dict[str, Any]:
+        """Gera (em segundo plano) o arquivo do relatório no formato pedido; reaproveita o que já existe ou está rodando."""
+        with self._lock:
+            export = job.exports.get(fmt)
+            if export and (export['status'] == 'running' or (export['status'] == 'done' and os.path.exists(export['path']))): return export
+            export = job.exports[fmt] = {'status': 'running', 'path': None, 'error': None}
+        self._pool.submit(self._export, job, fmt, export)
+        return export
+
+    def get(self, job_id: Optional[str], api_key: str) -> Optional[ReportJob]:
+        with self._lock:
+            job = self._jobs.get(job_id) if job_id else None
+        return job if job is not None and job.scope == credential_scope(api_key) else None
+
+    def jobs_for(self, api_key: str) -> List[ReportJob]:
+        """Relatórios da credencial, do mais recente para o mais antigo."""
+        scope = credential_scope(api_key)
+        with self._lock:
+            self._evict()
+            return [job for job in reversed(self._jobs.values()) if job.scope == scope]
+
+    def discard(self, job: ReportJob):
+        with self._lock:
+            if not job.active and self._jobs.pop(job.id, None) is not None: self._remove_files(job)
+
+    def _evict(self):
+        """Remove (com os arquivos) os terminados vencidos e, acima do limite, os terminados mais antigos. Chamar com o lock."""
+        now = time.time()
+        for job in [j for j in self._jobs.values() if not j.active and j.finished_at and now - j.finished_at > self.ttl]:
+            del self._jobs[job.id]; self._remove_files(job)
+        for job in [j for j in self._jobs.values() if not j.active][:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job.id]; self._remove_files(job)
+
+    @staticmethod
+    def _remove_files(job: ReportJob):
+        for export in job.exports.values():
+            if export['path'] and os.path.exists(export['path']): os.remove(export['path'])
+        job.result = None  # Libera a tabela mesmo que alguma sessão ainda guarde o job
+
+    def _run(self, job: ReportJob, api_key: str):
+        job.status, job.stage = 'running', "Baixando jobs"
+        try:
+            from billing_analytics import load_jobs_frame, describe_memory_footprint, summarize_jobs, compare_with_server_summary, build_daily_rollup
+            def on_progress(done: int, total: int):
+                job.progress = (done, total)
+            jobs, server_summary = load_billing_report(job.start_date, job.end_date, job.account_id, api_key, on_progress, job.include_summary)
+            job.stage = "Agregando"
+            df = load_jobs_frame(jobs)
+            footprint = describe_memory_footprint(jobs, df)
+            del jobs
+            summary = summarize_jobs(df)
+            rollup = build_daily_rollup(df)  # Uma vez por relatório: tendências e filtros da página saem dele
+            divergences, unmatched_models = compare_with_server_summary(summary, server_summary) if server_summary else (None, [])
+            job.result = {'jobs_df': df, 'rollup': rollup, 'summary': summary, 'footprint': footprint,
+                          'divergences': divergences, 'unmatched_models': unmatched_models}
+            job.status, job.stage = 'done', "Concluído"
+        except requests.exceptions.RequestException as e:
+            job.status, job.stage, job.error = 'failed', "Falhou", api_error_detail(e)
+        except Exception as e:
+            job.status, job.stage, job.error = 'failed', "Falhou", str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def _export(self, job: ReportJob, fmt: str, export: Dict[str, Any]):
+        try:
+            from billing_export import export_to_file
+            if job.result is None: raise RuntimeError("O relatório não está mais disponível.")
+            path = export_to_file(job.result['jobs_df'], fmt)
+            with self._lock:
+                if job.id not in self._jobs:  # Removido enquanto exportava
+                    os.remove(path); raise RuntimeError("O relatório não está mais disponível.")
+                export.update(status='done', path=path)
+        except Exception as e:
+            export.update(status='failed', error=str(e))
+
+report_executor = ReportExecutor()
@@ -2,21 +2,106 @@
 
 import streamlit as st
 import requests
-import pandas as pd
-import io
-from typing import List, Dict, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+import os
+import hashlib
+import inspect
+import functools
+import threading
+from typing import List, Dict, Optional, Any, Tuple, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from datetime import date, timedelta
-from decimal import Decimal
+import api_metrics
+import circuit_breaker
+from circuit_breaker import CircuitOpenError
 
 # --- CONFIGURAÇÃO ---
-API_BASE_URL = "https://setdoc-api-gateway-308638875599.southamerica-east1.run.app"
+API_BASE_URL = os.environ.get("TRI7_API_BASE_URL", "https://setdoc-api-gateway-308638875599.southamerica-east1.run.app")
+API_TIMEOUT = (5, 60)  # (conexão, leitura) em segundos
+API_LATENCY_BUDGET_MS = 10_000  # Respostas mais lentas que isso contam como falha no disjuntor do endpoint
+# Timeout e orçamento de latência por endpoint (caminho com {id}); os demais usam API_TIMEOUT e API_LATENCY_BUDGET_MS.
+# Orçamento None: resposta lenta mas bem-sucedida não conta como falha no disjuntor
+ENDPOINT_POLICIES: Dict[str, Tuple[Tuple[float, float], Optional[float]]] = {
+    "/admin/accounts/": ((5, 30), 10_000),
+    "/admin/accounts/{id}/users/": ((5, 15), 5_000),
+    "/admin/accounts/{id}/permissions": ((5, 15), 5_000),
+    "/admin/prompts/": ((5, 30), 10_000),
+    "/admin/prompts/{id}": ((5, 15), 5_000),
+    "/billing/report/": ((5, 60), 30_000),
+    # Uma janela de BILLING_WINDOW_DAYS dias: janelas lentas são esperadas e não devem suspender o relatório
+    "/billing/detailed-report/": ((5, 120), None),
+}
+API_MAX_RETRIES = 3  # Apenas para GET/HEAD, que são idempotentes
+API_POOL_SIZE = 10
+API_MAX_VALIDATORS = 256  # Respostas (ETag/Last-Modified + JSON) guardadas por cliente para revalidação
+PROMPT_TEXT_CACHE_CHARS = 2_000_000  # Limite (em caracteres) dos textos de prompt guardados no LRU
+PERMISSIONS_MAX_WORKERS = 8  # Contas lidas/salvas em paralelo na matriz de permissões
+USERS_PREFETCH_MAX_WORKERS = 8  # Contas cujos usuários são buscados em paralelo na busca global
+USERS_INDEX_MAX_AGE = 300  # Idade máxima (s) dos usuários de uma conta na busca global antes de buscá-los de novo
+API_MAX_CLIENTS = 32  # Clientes (pools de conexão) mantidos, um por chave de API
+API_CACHE_REFRESH_WORKERS = 4  # Threads que revalidam em segundo plano as entradas vencidas
+BILLING_WINDOW_DAYS = 7  # Tamanho de cada janela do relatório detalhado
+BILLING_MAX_WORKERS = 4  # Janelas baixadas em paralelo
+BILLING_WINDOW_ATTEMPTS = 3  # Rodadas de nova tentativa para as janelas que falharem
+AUTH_TIMEOUT = 10  # Segundos para a validação da chave no login
+AUTH_PROBE_PATH = os.environ.get("TRI7_AUTH_PROBE_PATH")  # Endpoint mínimo de admin (GET) para validar a chave; sem ele, HEAD em /admin/accounts/
 
 # --- FUNÇÕES DE AJUDA E ERRO ---
 def handle_api_error(e: requests.exceptions.RequestException, action: str):
     st.error(f"Falha ao {action}.")
-    if e.response is not None:
-        try: st.error(f"Detalhe: {e.response.json().get('detail', e.response.text)}")
-        except: st.error(f"Detalhe: {e.response.text}")
+    if e.response is not None or isinstance(e, CircuitOpenError): st.error(f"Detalhe: {api_error_detail(e)}")
+
+def show_stale_warning(action: str, age: float):
+    """Aviso de que a leitura falhou (gateway fora do ar ou disjuntor aberto) e o último valor bom está sendo exibido."""
+    age_text = f"{age / 60:.0f} min" if age >= 90 else f"{age:.0f} s"
+    st.warning(f"⚠️ Gateway indisponível ao {action}: exibindo os dados guardados há {age_text}, que podem estar desatualizados.")
+
+def api_error_detail(e: requests.exceptions.RequestException) -> str:
+    """Mensagem de erro de uma falha da API, sem usar o Streamlit (serve para resultados de operações em lote)."""
+    if e.response is None: return str(e)
+    try: return str(e.response.json().get('detail', e.response.text))
+    except: return e.response.text
+
+# --- PAINEL DE DESEMPENHO DA API (BARRA LATERAL) ---
+def render_api_metrics_panel():
+    """Painel lateral (liga/desliga) com as chamadas à API desta execução e os agregados da sessão e do processo.
+
+    Deve ser chamado no fim do script de cada página: mostra as chamadas registradas desde
+    a execução anterior do painel (inclusive as feitas em threads com api_metrics.propagate).
+    """
+    metrics = api_metrics.session_metrics()
+    if metrics is None: return
+    calls = metrics.drain_rerun()
+    breakers = circuit_breaker.breaker_states()
+    open_breakers = [b['endpoint'] for b in breakers if b['state'] != 'closed']
+    if open_breakers: st.sidebar.warning(f"Gateway instável: chamadas suspensas temporariamente para {', '.join(open_breakers)}.")
+    if not st.sidebar.toggle("📊 Desempenho da API", key="api_metrics_panel"): return
+    import pandas as pd  # Só quando o painel está ligado: o login e a navegação não carregam o pandas
+    with st.sidebar:
+        http_calls = [c for c in calls if c['kind'] == 'http']
+        cache_results = [c['cache'] for c in calls if c['kind'] == 'cache']
+        st.caption(f"Esta execução: {len(http_calls)} chamadas HTTP, {sum(c['latency_ms'] for c in http_calls):,.0f} ms, "
+                   f"{sum(c['bytes'] for c in http_calls) / 1024:,.1f} KiB; cache: {cache_results.count('hit') + cache_results.count('stale')} acertos, "
+                   f"{cache_results.count('miss') + cache_results.count('wait')} buscas")
+        if calls:
+            st.dataframe(pd.DataFrame([{
+                "Função": c['function'], "Chamada": f"{c['method']} {c['endpoint']}" if c['kind'] == 'http' else "cache",
+                "Status": c['status'] if c['kind'] == 'http' else c['cache'], "ms": c['latency_ms'],
+                "Bytes": c['bytes'], "Retent.": c['retries'],
+            } for c in calls]), use_container_width=True, hide_index=True)
+        scope = st.radio("Agregado:", ["Sessão", "Processo"], horizontal=True, key="api_metrics_scope")
+        source = metrics if scope == "Sessão" else api_metrics.process_metrics
+        summary = source.summary()
+        if summary: st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+        cache_summary = source.cache_summary()
+        if cache_summary: st.dataframe(pd.DataFrame(cache_summary), use_container_width=True, hide_index=True)
+        if breakers: st.dataframe(pd.DataFrame(breakers), use_container_width=True, hide_index=True)
+        col1, col2 = st.columns(2)
+        col1.download_button("JSON", data=source.to_json(), file_name="api_metrics.json", mime="application/json", use_container_width=True)
+        col2.download_button("Prometheus", data=source.to_prometheus(), file_name="api_metrics.prom", mime="text/plain", use_container_width=True)
 
 # --- FUNÇÕES DE API (COMPARTILHADAS) ---
 
@@ -24,112 +109,658 @@ def handle_api_error(e: requests.exceptions.RequestException, action: str):
 def get_headers(api_key: str) -> Dict[str, str]:
     return {"x-api-key": api_key}
 
+def credential_scope(api_key: str) -> str:
+    """Identificador estável (e não reversível) da credencial, para separar caches sem guardar a chave."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+# --- CLIENTE HTTP (POOL DE CONEXÕES KEEP-ALIVE) ---
+class AdminApiClient:
+    """Cliente da API de administração com uma sessão HTTP (keep-alive) por chave de API.
+
+    Reaproveita as conexões TCP/TLS com o gateway entre chamadas, aplica timeouts
+    padrão de conexão/leitura e repete com backoff apenas requisições idempotentes (falha de
+    conexão e 5xx/429; timeout de leitura não é repetido, para o timeout do endpoint valer pela chamada).
+    get_json(conditional=True) revalida com If-None-Match/If-Modified-Since e, num 304,
+    devolve o JSON já interpretado da resposta anterior.
+    """
+
+    def __init__(self, api_key: str, base_url: str = API_BASE_URL, timeout=API_TIMEOUT,
+                 max_retries: int = API_MAX_RETRIES, pool_size: int = API_POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        retry = Retry(
+            total=max_retries, read=False, backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(get_headers(api_key))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._validators: "OrderedDict[tuple, Tuple[Optional[str], Optional[str], Any]]" = OrderedDict()  # (path, params) -> (etag, last_modified, json)
+        self._validators_lock = threading.Lock()
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Faz a chamada e registra endpoint, status, latência, bytes e retentativas em api_metrics.
+
+        Usa o timeout do endpoint (ENDPOINT_POLICIES) e passa pelos disjuntores do gateway e do
+        endpoint: com algum aberto levanta CircuitOpenError sem chamar o gateway. Erros de conexão,
+        timeouts e 5xx/429 contam como falha nos dois; respostas acima do orçamento de latência
+        (se o endpoint tiver um), só no do endpoint.
+        """
+        endpoint = api_metrics.endpoint_template(path)
+        timeout, budget_ms = ENDPOINT_POLICIES.get(endpoint, (self.timeout, API_LATENCY_BUDGET_MS))
+        kwargs.setdefault("timeout", timeout)
+        gateway, breaker = circuit_breaker.breaker_for(self.base_url), circuit_breaker.breaker_for(self.base_url, endpoint)
+        breaker.before_call()
+        try: gateway.before_call()
+        except CircuitOpenError: breaker.cancel_probe(); raise
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException as e:
+            api_metrics.record_http(method, path, None, (time.perf_counter() - started) * 1000, 0, 0)
+            gateway.record_failure(type(e).__name__); breaker.record_failure(type(e).__name__)
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        retries = getattr(response.raw, "retries", None)  # Retry do urllib3 com o histórico das retentativas
+        api_metrics.record_http(method, path, response.status_code, latency_ms,
+                                len(response.content), len(retries.history) if retries is not None else 0)
+        if response.status_code in circuit_breaker.FAILURE_STATUSES:
+            gateway.record_failure(f"HTTP {response.status_code}"); breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            gateway.record_success()
+            if budget_ms is not None and latency_ms > budget_ms: breaker.record_failure(f"{latency_ms:,.0f} ms (orçamento de {budget_ms:,.0f} ms)")
+            else: breaker.record_success()
+        response.raise_for_status()
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response: return self.request("GET", path, **kwargs)
+    def post(self, path: str, **kwargs) -> requests.Response: return self.request("POST", path, **kwargs)
+    def put(self, path: str, **kwargs) -> requests.Response: return self.request("PUT", path, **kwargs)
+    def delete(self, path: str, **kwargs) -> requests.Response: return self.request("DELETE", path, **kwargs)
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None, conditional: bool = False,
+                 transform: Optional[Callable[[Any], Any]] = None) -> Any:
+        """GET que devolve o JSON; com conditional=True, reaproveita o corpo anterior quando o gateway responde 304.
+
+        transform (opcional) é aplicado ao JSON antes de guardá-lo, para que só a versão
+        reduzida fique na memória entre as revalidações.
+        """
+        transform = transform or (lambda data: data)
+        if not conditional: return transform(self.get(path, params=params).json())
+        key = (path, tuple(sorted((params or {}).items())), transform.__qualname__)
+        with self._validators_lock: cached = self._validators.get(key)
+        headers = {}
+        if cached and cached[0]: headers["If-None-Match"] = cached[0]
+        if cached and cached[1]: headers["If-Modified-Since"] = cached[1]
+        response = self.get(path, params=params, headers=headers)
+        if response.status_code == 304 and cached: return cached[2]
+        data = transform(response.json())
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        with self._validators_lock:
+            if etag or last_modified:
+                self._validators[key] = (etag, last_modified, data)
+                self._validators.move_to_end(key)
+                while len(self._validators) > API_MAX_VALIDATORS: self._validators.popitem(last=False)
+            else: self._validators.pop(key, None)
+        return data
+
+_api_clients: "OrderedDict[str, AdminApiClient]" = OrderedDict()
+_api_clients_lock = threading.Lock()
+
+def get_api_client(api_key: str) -> AdminApiClient:
+    """Um único cliente (e pool de conexões) por chave de API, compartilhado entre sessões e threads.
+
+    Fica num registro do módulo (e não em st.cache_resource) para poder ser usado também
+    pelas threads de segundo plano, que não têm contexto de execução do Streamlit.
+    """
+    with _api_clients_lock:
+        client = _api_clients.pop(api_key, None) or AdminApiClient(api_key)
+        _api_clients[api_key] = client  # Mais recente no fim (LRU)
+        while len(_api_clients) > API_MAX_CLIENTS: _api_clients.popitem(last=False)[1].session.close()
+    return client
+
+# --- CACHE DE LEITURAS (CHAVEADO POR FUNÇÃO + ARGUMENTOS, COM INVALIDAÇÃO SELETIVA) ---
+class ApiCache:
+    """Cache em memória do processo para as leituras da API, compartilhado entre as sessões.
+
+    Cada entrada é chaveada por (função, credencial, demais argumentos), então uma mutação
+    pode remover ou atualizar só as entradas que ela afeta, em vez de limpar tudo. Os valores
+    guardados nunca são alterados no lugar: update() grava uma cópia com a mudança.
+
+    Buscas concorrentes da mesma chave são coalescidas (uma só requisição ao gateway, as
+    demais esperam o resultado). Dentro da janela stale_ttl depois do TTL, o valor antigo é
+    devolvido na hora e uma única revalidação roda em segundo plano.
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, Tuple[float, Any]] = {}  # chave -> (momento da busca, valor)
+        self._inflight: Dict[tuple, Tuple[Future, int]] = {}  # chave -> (busca em andamento, versão da função quando começou)
+        self._versions: Dict[str, int] = {}  # função -> nº de mutações; buscas anteriores a uma mutação não são gravadas
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=API_CACHE_REFRESH_WORKERS, thread_name_prefix="api-cache-refresh")
+
+    def _current_inflight(self, key: tuple) -> Optional[Future]:
+        """Busca em andamento da chave, se começou depois da última mutação da função (chamar com o lock)."""
+        inflight = self._inflight.get(key)
+        return inflight[0] if inflight is not None and inflight[1] == self._versions.get(key[0], 0) else None
+
+    def get_or_load(self, key: tuple, fetch: Callable[[], Any], ttl: float, stale_ttl: float = 0) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry[0] if entry else None
+            version = self._versions.get(key[0], 0)
+            if entry and age < ttl:
+                result = "hit"
+            elif entry and age < ttl + stale_ttl:
+                result = "stale"
+                if self._current_inflight(key) is None:
+                    future = self._inflight_future(key, version)
+                    self._refresher.submit(self._load, key, fetch, version, future)
+            else:
+                # Uma busca iniciada antes de uma mutação (evict/update) traria o valor antigo: começa outra
+                future = self._current_inflight(key)
+                if future is None: result, future = "miss", self._inflight_future(key, version)
+                else: result = "wait"
+        if result in ("hit", "stale"):
+            api_metrics.record_cache(key[0], result, (time.perf_counter() - started) * 1000)
+            return entry[1]
+        try:
+            if result == "wait": return future.result()  # Outra sessão já está buscando: espera o mesmo resultado
+            return self._load(key, fetch, version, future)
+        finally:
+            api_metrics.record_cache(key[0], result, (time.perf_counter() - started) * 1000)
+
+    def _inflight_future(self, key: tuple, version: int) -> Future:
+        future: Future = Future()
+        self._inflight[key] = (future, version)
+        return future
+
+    def _load(self, key: tuple, fetch: Callable[[], Any], version: int, future: Future) -> Any:
+        try:
+            value = fetch()
+            with self._lock:
+                if self._versions.get(key[0], 0) == version: self._entries[key] = (time.monotonic(), value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key, (None,))[0] is future: del self._inflight[key]
+
+    def _bump(self, name: str):
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def peek(self, key: tuple) -> Optional[Tuple[float, Any]]:
+        """(idade em segundos, valor) da entrada guardada, mesmo vencida, sem buscar; None se não houver."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (time.monotonic() - entry[0], entry[1]) if entry else None
+
+    def put(self, key: tuple, value: Any):
+        """Grava um valor obtido fora do cache (ex.: a lista baixada no login) como recém-buscado."""
+        with self._lock: self._entries[key] = (time.monotonic(), value)
+
+    def prefetch(self, key: tuple, fetch: Callable[[], Any], ttl: float, stale_ttl: float = 0):
+        """Começa a busca em segundo plano, sem esperar nem levantar erros; quem pedir a chave depois espera por ela."""
+        self._refresher.submit(api_metrics.propagate(self.get_or_load), key, fetch, ttl, stale_ttl)
+
+    def evict(self, key: tuple):
+        with self._lock: self._entries.pop(key, None); self._bump(key[0])
+
+    def clear(self, name: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == name]: del self._entries[key]
+            self._bump(name)
+
+    def update(self, name: str, scope: str, fn: Callable[[Dict[str, Any], Any], Any]):
+        """Aplica fn(argumentos, valor) -> novo valor a cada entrada de `name` da credencial (sem renovar o TTL)."""
+        with self._lock:
+            for key, (stored_at, value) in list(self._entries.items()):
+                if key[0] == name and key[1] == scope:
+                    self._entries[key] = (stored_at, fn(dict(key[2]), value))
+            self._bump(name)
+
+_api_cache = ApiCache()
+
+def cached_api(ttl: float, action: str, default: Any = None, stale_ttl: float = 0):
+    """Decorator das leituras da API: cacheia o retorno em _api_cache e trata erros como handle_api_error.
+
+    A função decorada só faz a chamada HTTP (pode levantar RequestException, e pode rodar
+    numa thread de revalidação); falhas não são cacheadas. A chave usa credential_scope(api_key)
+    no lugar da chave de API. stale_ttl > 0 liga o stale-while-revalidate (ver ApiCache).
+    Expõe .invalidate(*args), .update(api_key, fn) e .clear() para as mutações, .load(*args),
+    que usa o mesmo cache mas levanta a exceção em vez de exibi-la (para uso em threads),
+    .peek(*args), que devolve (idade, valor) da entrada guardada sem buscar, .seed(value, *args),
+    que guarda um valor já baixado por outro caminho, e .prefetch(*args), que inicia a busca
+    em segundo plano.
+
+    Se a busca falhar por causa do gateway (fora do ar, lento ou com o disjuntor aberto) e
+    houver um valor bom guardado, mesmo vencido, a função devolve esse valor com um aviso de
+    dados desatualizados; .load_or_stale(*args) faz o mesmo sem o Streamlit, devolvendo
+    (valor, idade do valor antigo ou None).
+    """
+    def decorator(fetch: Callable):
+        signature = inspect.signature(fetch)
+        name = fetch.__qualname__
+
+        def make_key(*args, **kwargs) -> tuple:
+            arguments = signature.bind(*args, **kwargs).arguments
+            scope = credential_scope(arguments.pop("api_key"))
+            return (name, scope, tuple(sorted(arguments.items())))
+
+        def fetcher(*args, **kwargs) -> Callable[[], Any]:
+            return lambda: api_metrics.in_function(name, fetch, *args, **kwargs)
+
+        def load(*args, **kwargs):
+            return _api_cache.get_or_load(make_key(*args, **kwargs), fetcher(*args, **kwargs), ttl, stale_ttl)
+
+        def load_or_stale(*args, **kwargs) -> Tuple[Any, Optional[float]]:
+            try: return load(*args, **kwargs), None
+            except requests.exceptions.RequestException as e:
+                entry = _api_cache.peek(make_key(*args, **kwargs)) if circuit_breaker.is_gateway_failure(e) else None
+                if entry is None: raise
+                api_metrics.record_cache(name, "fallback", 0.0)
+                return entry[1], entry[0]
+
+        @functools.wraps(fetch)
+        def wrapper(*args, **kwargs):
+            try: value, stale_age = load_or_stale(*args, **kwargs)
+            except requests.exceptions.RequestException as e: handle_api_error(e, action); return default
+            if stale_age is not None: show_stale_warning(action, stale_age)
+            return value
+
+        wrapper.load = load
+        wrapper.load_or_stale = load_or_stale
+        wrapper.peek = lambda *args, **kwargs: _api_cache.peek(make_key(*args, **kwargs))
+        wrapper.invalidate = lambda *args, **kwargs: _api_cache.evict(make_key(*args, **kwargs))
+        wrapper.update = lambda api_key, fn: _api_cache.update(name, credential_scope(api_key), fn)
+        wrapper.clear = lambda: _api_cache.clear(name)
+        wrapper.seed = lambda value, *args, **kwargs: _api_cache.put(make_key(*args, **kwargs), value)
+        wrapper.prefetch = lambda *args, **kwargs: _api_cache.prefetch(make_key(*args, **kwargs), fetcher(*args, **kwargs), ttl, stale_ttl)
+        return wrapper
+    return decorator
+
+def _replace_item(items: Optional[List[Dict]], item_id: int, **changes) -> Optional[List[Dict]]:
+    """Cópia da lista com o item de id `item_id` atualizado (a lista cacheada original não é alterada).
+
+    Sem o item, devolve a própria lista: as outras entradas do cache mantêm a identidade (e os índices do directory).
+    """
+    if items is None or not any(item.get("id") == item_id for item in items): return items
+    return [{**item, **changes} if item.get("id") == item_id else item for item in items]
+
+_auth_probe_unsupported: set = set()  # URLs base cujo gateway recusou a sonda (404/405/501)
+
 def check_admin_auth(api_key: str) -> bool:
-    """Tenta autenticar no endpoint de admin."""
+    """Valida a chave de admin com uma chamada leve: GET em AUTH_PROBE_PATH ou HEAD em /admin/accounts/.
+
+    Com a chave válida, a lista de contas (que a primeira página vai pedir) começa a ser
+    baixada em segundo plano. Se o gateway não aceitar a sonda, a validação baixa a lista
+    uma única vez e a guarda no cache de get_all_accounts, em vez de descartá-la.
+    """
+    client = get_api_client(api_key)
     try:
-        response = requests.get(f"{API_BASE_URL}/admin/accounts/", headers=get_headers(api_key), timeout=10)
-        response.raise_for_status()
+        if client.base_url not in _auth_probe_unsupported:
+            try:
+                if AUTH_PROBE_PATH: client.get(AUTH_PROBE_PATH, timeout=AUTH_TIMEOUT)
+                else: client.request("HEAD", "/admin/accounts/", timeout=AUTH_TIMEOUT)
+                get_all_accounts.prefetch(api_key)
+                return True
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code not in (404, 405, 501): raise
+                _auth_probe_unsupported.add(client.base_url)
+        accounts = api_metrics.in_function(get_all_accounts.__name__, client.get_json, "/admin/accounts/", conditional=True)
+        get_all_accounts.seed(accounts, api_key)
         return True
-    except requests.exceptions.RequestException as e:
-        if e.response is not None and e.response.status_code == 403: return False
+    except requests.exceptions.RequestException:
         return False
 
 # Funções de Contas e Usuários
-@st.cache_data(ttl=30)
+@cached_api(ttl=30, action="buscar contas", stale_ttl=300)
 def get_all_accounts(api_key: str) -> Optional[List[Dict]]:
-    try:
-        response = requests.get(f"{API_BASE_URL}/admin/accounts/", headers=get_headers(api_key)); response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e: handle_api_error(e, "buscar contas"); return None
+    return get_api_client(api_key).get_json("/admin/accounts/", conditional=True)
 
-def create_new_account(name: str, cod_tri7: Optional[int], cidade: Optional[str], uf: Optional[str], api_key: str):
+def _post_account(name: str, cod_tri7: Optional[int], cidade: Optional[str], uf: Optional[str], api_key: str) -> Dict:
+    """Cria a conta e devolve o registro, sem tocar no cache nem no Streamlit (pode rodar em threads)."""
     payload = {"name": name}
     if cod_tri7: payload["cod_tri7"] = cod_tri7
     if cidade: payload["cidade"] = cidade
     if uf: payload["uf"] = uf
-    try:
-        response = requests.post(f"{API_BASE_URL}/admin/accounts/", headers=get_headers(api_key), json=payload); response.raise_for_status()
-        return response.json()
+    return get_api_client(api_key).post("/admin/accounts/", json=payload).json()
+
+def create_new_account(name: str, cod_tri7: Optional[int], cidade: Optional[str], uf: Optional[str], api_key: str):
+    try: account = _post_account(name, cod_tri7, cidade, uf, api_key)
     except requests.exceptions.RequestException as e: handle_api_error(e, "criar conta"); return None
+    # A conta criada entra na lista cacheada; sem o registro completo, a lista é buscada de novo
+    if isinstance(account, dict) and "id" in account: get_all_accounts.update(api_key, lambda args, accounts: None if accounts is None else accounts + [account])
+    else: get_all_accounts.invalidate(api_key)
+    return account
 
-@st.cache_data(ttl=30)
+@cached_api(ttl=30, action="buscar usuários")
 def get_users_for_account(account_id: int, api_key: str) -> Optional[List[Dict]]:
-    try:
-        response = requests.get(f"{API_BASE_URL}/admin/accounts/{account_id}/users/", headers=get_headers(api_key)); response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e: handle_api_error(e, "buscar usuários"); return None
+    return get_api_client(api_key).get(f"/admin/accounts/{account_id}/users/").json()
 
-def create_new_user(full_name: str, email: str, password: str, account_id: int, api_key: str):
+def _post_user(full_name: str, email: str, password: str, account_id: int, api_key: str) -> Dict:
+    """Cria o usuário e devolve o registro (com a chave de API), sem tocar no cache nem no Streamlit."""
     payload = {"full_name": full_name, "email": email, "password": password, "account_id": account_id}
-    try: 
-        response = requests.post(f"{API_BASE_URL}/admin/users/", headers=get_headers(api_key), json=payload); response.raise_for_status()
-        return response.json()
+    return get_api_client(api_key).post("/admin/users/", json=payload).json()
+
+def create_new_user(full_name: str, email: str, password: str, account_id: int, api_key: str):
+    try: user = _post_user(full_name, email, password, account_id, api_key)
     except requests.exceptions.RequestException as e: handle_api_error(e, "criar usuário"); return None
+    # Só a lista de usuários dessa conta muda; a chave de API gerada não vai para o cache
+    if isinstance(user, dict) and "id" in user:
+        cached_user = {k: v for k, v in user.items() if k != "api_key"}
+        get_users_for_account.update(api_key, lambda args, users: users + [cached_user] if users is not None and args["account_id"] == account_id else users)
+    else: get_users_for_account.invalidate(account_id, api_key)
+    return user
 
 def set_account_status(account_id: int, is_active: bool, api_key: str) -> bool:
-    try:
-        response = requests.put(f"{API_BASE_URL}/admin/accounts/{account_id}/status?active_status={is_active}", headers=get_headers(api_key)); response.raise_for_status()
-        return True
+    try: get_api_client(api_key).put(f"/admin/accounts/{account_id}/status", params={"active_status": is_active})
     except requests.exceptions.RequestException as e: handle_api_error(e, f"mudar status da conta"); return False
+    get_all_accounts.update(api_key, lambda args, accounts: _replace_item(accounts, account_id, is_active=is_active))
+    return True
 
 def set_user_status(user_id: int, is_active: bool, api_key: str) -> bool:
-    try:
-        response = requests.put(f"{API_BASE_URL}/admin/users/{user_id}/status?active_status={is_active}", headers=get_headers(api_key)); response.raise_for_status()
-        return True
+    try: get_api_client(api_key).put(f"/admin/users/{user_id}/status", params={"active_status": is_active})
     except requests.exceptions.RequestException as e: handle_api_error(e, f"mudar status do usuário"); return False
+    # Atualiza só a lista (cacheada) da conta que contém o usuário
+    get_users_for_account.update(api_key, lambda args, users: _replace_item(users, user_id, is_active=is_active))
+    return True
 
 def regenerate_api_key(user_id: int, api_key: str) -> Optional[str]:
-    try:
-        response = requests.post(f"{API_BASE_URL}/admin/users/{user_id}/regenerate-api-key", headers=get_headers(api_key)); response.raise_for_status()
-        return response.json().get("api_key")
+    # Nenhuma leitura cacheada contém a chave do usuário: nada a invalidar
+    try: return get_api_client(api_key).post(f"/admin/users/{user_id}/regenerate-api-key").json().get("api_key")
     except requests.exceptions.RequestException as e: handle_api_error(e, "regenerar chave de API"); return None
 
 # Funções de Prompts e Permissões
-@st.cache_data(ttl=60)
+@cached_api(ttl=60, action="buscar prompts", stale_ttl=600)
 def get_all_prompts(api_key: str):
-    try: response = requests.get(f"{API_BASE_URL}/admin/prompts/", headers=get_headers(api_key)); response.raise_for_status(); return response.json()
-    except requests.exceptions.RequestException as e: handle_api_error(e, "buscar prompts"); return None
+    return get_api_client(api_key).get_json("/admin/prompts/", conditional=True)
+
+def _prompt_content_hash(text: Optional[str]) -> str:
+    return hashlib.sha256((text or "").encode()).hexdigest()[:16]
+
+def _summarize_prompts(prompts: List[Dict]) -> List[Dict]:
+    return [{"id": p["id"], "name": p["name"], "content_hash": _prompt_content_hash(p.get("prompt_text"))} for p in prompts]
+
+@cached_api(ttl=60, action="buscar prompts", stale_ttl=600)
+def get_prompt_summaries(api_key: str) -> Optional[List[Dict]]:
+    """Lista leve de prompts (id, name, content_hash), sem o texto. Para o texto, ver get_prompt_text."""
+    return get_api_client(api_key).get_json("/admin/prompts/", conditional=True, transform=_summarize_prompts)
+
+class _SizedLRU:
+    """LRU limitado pela soma dos tamanhos (len) dos valores, e não pelo número de entradas."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[tuple, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            if key not in self._items: return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key: tuple, value: str):
+        with self._lock:
+            if key in self._items: self._size -= len(self._items.pop(key))
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self.max_size and len(self._items) > 1: self._size -= len(self._items.popitem(last=False)[1])
+
+_prompt_texts = _SizedLRU(PROMPT_TEXT_CACHE_CHARS)
+
+_prompt_by_id_unsupported: set = set()  # URLs base cujo gateway não tem GET /admin/prompts/{id} (405/501)
+
+def _prompt_text_from_list(prompt_id: int, content_hash: str, api_key: str) -> Optional[str]:
+    """Texto do prompt tirado de get_all_prompts (cacheado e revalidado por ETag); relê a lista se ela for anterior ao hash pedido."""
+    for attempt in range(2):
+        text = next((p.get("prompt_text", "") for p in get_all_prompts.load(api_key) or [] if p["id"] == prompt_id), None)
+        if text is not None and _prompt_content_hash(text) == content_hash: return text
+        if attempt == 0: get_all_prompts.invalidate(api_key)
+    return text
+
+def get_prompt_text(prompt_id: int, content_hash: str, api_key: str) -> Optional[str]:
+    """Texto de um prompt, buscado só quando pedido e guardado num LRU limitado por tamanho.
+
+    A chave inclui o content_hash da lista de resumos: quando o prompt muda, o hash muda e
+    o texto antigo nunca é servido. Se o gateway não tiver GET /admin/prompts/{id}, isso fica
+    registrado para a URL base e o texto sai da lista completa em cache (get_all_prompts).
+    """
+    key = (credential_scope(api_key), prompt_id, content_hash)
+    text = _prompt_texts.get(key)
+    if text is not None: return text
+    client = get_api_client(api_key)
+    try:
+        if client.base_url not in _prompt_by_id_unsupported:
+            try: text = client.get_json(f"/admin/prompts/{prompt_id}").get("prompt_text", "")
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 405, 501): raise
+                if e.response.status_code != 404: _prompt_by_id_unsupported.add(client.base_url)
+        if text is None: text = _prompt_text_from_list(prompt_id, content_hash, api_key)
+    except requests.exceptions.RequestException as e: handle_api_error(e, "buscar texto do prompt"); return None
+    if text is None:
+        st.error(f"Prompt {prompt_id} não encontrado; atualize a lista de prompts."); return None
+    _prompt_texts.put(key, text)
+    return text
 
 def create_new_prompt(name: str, text: str, api_key: str):
-    try: response = requests.post(f"{API_BASE_URL}/admin/prompts/", headers=get_headers(api_key), json={"name": name, "prompt_text": text}); response.raise_for_status(); return response.json()
+    try: prompt = get_api_client(api_key).post("/admin/prompts/", json={"name": name, "prompt_text": text}).json()
     except requests.exceptions.RequestException as e: handle_api_error(e, "criar prompt"); return None
+    if isinstance(prompt, dict) and "id" in prompt:
+        get_all_prompts.update(api_key, lambda args, prompts: None if prompts is None else prompts + [prompt])
+        get_prompt_summaries.update(api_key, lambda args, summaries: None if summaries is None else summaries + _summarize_prompts([prompt]))
+    else: get_all_prompts.invalidate(api_key); get_prompt_summaries.invalidate(api_key)
+    return prompt
 
 def update_prompt_details(prompt_id: int, name: str, text: str, api_key: str):
-    try: response = requests.put(f"{API_BASE_URL}/admin/prompts/{prompt_id}", headers=get_headers(api_key), json={"name": name, "prompt_text": text}); response.raise_for_status(); return True
+    try: get_api_client(api_key).put(f"/admin/prompts/{prompt_id}", json={"name": name, "prompt_text": text})
     except requests.exceptions.RequestException as e: handle_api_error(e, "atualizar prompt"); return False
+    content_hash = _prompt_content_hash(text)
+    get_all_prompts.update(api_key, lambda args, prompts: _replace_item(prompts, prompt_id, name=name, prompt_text=text))
+    get_prompt_summaries.update(api_key, lambda args, summaries: _replace_item(summaries, prompt_id, name=name, content_hash=content_hash))
+    _prompt_texts.put((credential_scope(api_key), prompt_id, content_hash), text)
+    return True
 
 def delete_prompt(prompt_id: int, api_key: str):
-    try: response = requests.delete(f"{API_BASE_URL}/admin/prompts/{prompt_id}", headers=get_headers(api_key)); response.raise_for_status(); return True
+    try: get_api_client(api_key).delete(f"/admin/prompts/{prompt_id}")
     except requests.exceptions.RequestException as e: handle_api_error(e, "deletar prompt"); return False
+    get_all_prompts.update(api_key, lambda args, prompts: None if prompts is None else [p for p in prompts if p.get("id") != prompt_id])
+    get_prompt_summaries.update(api_key, lambda args, summaries: None if summaries is None else [p for p in summaries if p.get("id") != prompt_id])
+    get_account_permissions.update(api_key, lambda args, prompt_ids: [pid for pid in prompt_ids if pid != prompt_id] if prompt_id in prompt_ids else prompt_ids)
+    return True
 
-@st.cache_data(ttl=60)
+@cached_api(ttl=60, action="buscar permissões", default=[])
 def get_account_permissions(account_id: int, api_key: str):
-    try: 
-        response = requests.get(f"{API_BASE_URL}/admin/accounts/{account_id}/permissions", headers=get_headers(api_key)); response.raise_for_status()
-        return response.json().get("prompt_ids", [])
-    except requests.exceptions.RequestException as e: handle_api_error(e, "buscar permissões"); return []
+    return get_api_client(api_key).get_json(f"/admin/accounts/{account_id}/permissions", conditional=True).get("prompt_ids", [])
+
+def _put_account_permissions(account_id: int, prompt_ids: List[int], api_key: str):
+    get_api_client(api_key).put(f"/admin/accounts/{account_id}/permissions", json={"prompt_ids": prompt_ids})
+    # Atualiza só a entrada da conta salva com o que foi enviado
+    get_account_permissions.update(api_key, lambda args, current: list(prompt_ids) if args["account_id"] == account_id else current)
 
 def sync_account_permissions(account_id: int, prompt_ids: List[int], api_key: str):
-    try:
-        response = requests.put(f"{API_BASE_URL}/admin/accounts/{account_id}/permissions", headers=get_headers(api_key), json={"prompt_ids": prompt_ids})
-        response.raise_for_status()
-        get_account_permissions.clear() # Limpa o cache após salvar
-        return True
+    try: _put_account_permissions(account_id, prompt_ids, api_key); return True
     except requests.exceptions.RequestException as e: handle_api_error(e, "salvar permissões"); return False
 
+def _run_per_account(task: Callable[[int], Any], account_ids: List[int],
+                     on_progress: Optional[Callable[[int, int], None]] = None,
+                     max_workers: int = PERMISSIONS_MAX_WORKERS) -> Tuple[Dict[int, Any], Dict[int, str]]:
+    """Executa task(account_id) para várias contas com concorrência limitada; devolve (resultados, erros) por conta."""
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="per-account") as executor:
+        futures = {executor.submit(api_metrics.propagate(task), account_id): account_id for account_id in account_ids}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try: results[futures[future]] = future.result()
+            except requests.exceptions.RequestException as e: errors[futures[future]] = api_error_detail(e)
+            if on_progress: on_progress(done, len(futures))
+    return results, errors
+
+def _split_stale(loaded: Dict[int, Tuple[Any, Optional[float]]]) -> Tuple[Dict[int, Any], List[int]]:
+    """Separa os resultados de load_or_stale em (valores por conta, contas cujo valor é o último bom guardado)."""
+    return {account_id: value for account_id, (value, _) in loaded.items()}, [account_id for account_id, (_, age) in loaded.items() if age is not None]
+
+def load_permissions_matrix(account_ids: List[int], api_key: str, on_progress: Optional[Callable[[int, int], None]] = None
+                            ) -> Tuple[Dict[int, List[int]], Dict[int, str], List[int]]:
+    """Permissões (prompt_ids) de várias contas, buscadas em paralelo e pelo mesmo cache de get_account_permissions.
+
+    Devolve (permissões por conta, erros por conta, contas exibidas com o último valor bom por falha do gateway).
+    """
+    loaded, errors = _run_per_account(lambda account_id: get_account_permissions.load_or_stale(account_id, api_key), account_ids, on_progress)
+    matrix, stale = _split_stale(loaded)
+    return matrix, errors, stale
+
+def sync_permissions_bulk(changes: Dict[int, List[int]], api_key: str,
+                          on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[int, Optional[str]]:
+    """Salva em paralelo as permissões das contas em `changes` (só as que mudaram); devolve, por conta, None (ok) ou o erro."""
+    _, errors = _run_per_account(lambda account_id: _put_account_permissions(account_id, changes[account_id], api_key), list(changes), on_progress)
+    return {account_id: errors.get(account_id) for account_id in changes}
+
+def load_users_index(account_ids: List[int], api_key: str, on_progress: Optional[Callable[[int, int], None]] = None,
+                     max_age: float = USERS_INDEX_MAX_AGE) -> Tuple[Dict[int, List[Dict]], Dict[int, str], int, List[int]]:
+    """Usuários de várias contas para a busca global, pelo mesmo cache de get_users_for_account.
+
+    Só as contas sem usuários no cache, ou com usuários guardados há mais de max_age segundos,
+    são buscadas (em paralelo, com concorrência limitada); as demais saem do cache sem chamada.
+    Devolve (usuários por conta, erros por conta, nº de contas buscadas agora, contas exibidas
+    com o último valor bom por falha do gateway).
+    """
+    users_by_account, expired = {}, []
+    for account_id in account_ids:
+        entry = get_users_for_account.peek(account_id, api_key)
+        if entry is not None and entry[0] < max_age: users_by_account[account_id] = entry[1]
+        else: expired.append(account_id)
+    loaded, errors = _run_per_account(lambda account_id: get_users_for_account.load_or_stale(account_id, api_key), expired,
+                                      on_progress, max_workers=USERS_PREFETCH_MAX_WORKERS)
+    fetched, stale = _split_stale(loaded)
+    users_by_account.update(fetched)
+    return users_by_account, errors, len(expired), stale
+
 # Função de Faturamento
-def get_master_billing_report(start_date: str, end_date: str, account_id: Optional[int], api_key: str):
+def _billing_params(start_date: str, end_date: str, account_id: Optional[int]) -> Dict[str, Any]:
     params = {"start_date": start_date, "end_date": end_date}
     if account_id is not None: params["account_id"] = account_id
-    try:
-        response = requests.get(f"{API_BASE_URL}/billing/report/", headers=get_headers(api_key), params=params); response.raise_for_status()
-        return response.json()
+    return params
+
+def get_master_billing_report(start_date: str, end_date: str, account_id: Optional[int], api_key: str):
+    try: return get_api_client(api_key).get("/billing/report/", params=_billing_params(start_date, end_date, account_id)).json()
     except requests.exceptions.RequestException as e: handle_api_error(e, "gerar relatório"); return None
 
 def get_detailed_billing_jobs(start_date: str, end_date: str, account_id: Optional[int], api_key: str):
-    params = {"start_date": start_date, "end_date": end_date}
-    if account_id is not None: params["account_id"] = account_id
-    try:
-        response = requests.get(f"{API_BASE_URL}/billing/detailed-report/", headers=get_headers(api_key), params=params); response.raise_for_status()
-        return response.json()
+    try: return get_api_client(api_key).get("/billing/detailed-report/", params=_billing_params(start_date, end_date, account_id)).json()
     except requests.exceptions.RequestException as e: handle_api_error(e, "buscar detalhe do relatório"); return None
+
+def split_date_range(start_date: date, end_date: date, window_days: int = BILLING_WINDOW_DAYS) -> List[Tuple[date, date]]:
+    """Divide o período [start_date, end_date] (datas inclusivas) em janelas consecutivas de até window_days dias."""
+    windows = []
+    while start_date <= end_date:
+        window_end = min(start_date + timedelta(days=window_days - 1), end_date)
+        windows.append((start_date, window_end))
+        start_date = window_end + timedelta(days=1)
+    return windows
+
+def _contiguous_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Agrupa dias (ordenados) em intervalos contínuos: [1, 2, 3, 7, 8] -> [(1, 3), (7, 8)]."""
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1): ranges[-1] = (ranges[-1][0], day)
+        else: ranges.append((day, day))
+    return ranges
+
+def _fetch_jobs_windowed(client: AdminApiClient, windows: List[Tuple[date, date]], account_id: Optional[int],
+                         on_progress: Optional[Callable[[int, int], None]] = None,
+                         on_window: Optional[Callable[[Tuple[date, date], List[Dict]], None]] = None,
+                         abort_on: Optional[Future] = None) -> List[Dict]:
+    """Baixa o detalhe de jobs das janelas em paralelo e junta tudo na ordem das janelas.
+
+    Só as janelas que falharam são repetidas nas rodadas seguintes; se alguma continuar
+    falhando, a última exceção é levantada. Janelas recusadas por um disjuntor aberto esperam ele
+    liberar a chamada de teste (CircuitOpenError.retry_in) e, enquanto outras janelas avançam,
+    não gastam tentativa. Se abort_on (o resumo do servidor) falhar, a exceção dele é levantada
+    na hora, sem esperar as janelas em andamento. on_progress(concluídas, total) e
+    on_window(janela, jobs) são chamados na thread de quem chamou a função, então podem
+    atualizar widgets do Streamlit.
+    """
+    fetch = api_metrics.propagate(lambda w: client.get("/billing/detailed-report/", params=_billing_params(str(w[0]), str(w[1]), account_id)).json())
+    results: Dict[int, List[Dict]] = {}
+    pending = list(range(len(windows)))
+    executor = ThreadPoolExecutor(max_workers=BILLING_MAX_WORKERS, thread_name_prefix="billing-window")
+    try:
+        failures: Dict[int, requests.exceptions.RequestException] = {}
+        failed_rounds, delay = 0, 0.0
+        while pending:
+            if delay: time.sleep(delay)
+            futures = {executor.submit(fetch, windows[i]): i for i in pending}
+            failures = {}
+            for future in as_completed([*futures, *([abort_on] if abort_on is not None else [])]):
+                if future is abort_on:
+                    if abort_on.exception() is not None: raise abort_on.exception()
+                    continue
+                i = futures[future]
+                try: results[i] = future.result()
+                except requests.exceptions.RequestException as e: failures[i] = e; continue
+                if on_window: on_window(windows[i], results[i])
+                if on_progress: on_progress(len(results), len(windows))
+            if not failures: break
+            # Rodada em que o disjuntor só recusou janelas enquanto outras avançavam não conta como tentativa
+            rejected = [e.retry_in for e in failures.values() if isinstance(e, CircuitOpenError)]
+            if len(rejected) < len(failures) or len(failures) == len(pending): failed_rounds += 1
+            if failed_rounds >= BILLING_WINDOW_ATTEMPTS: break
+            pending = sorted(failures)
+            delay = max([max(failed_rounds, 1)] + rejected)
+        if failures: raise failures[min(failures)]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [job for i in range(len(windows)) for job in results[i]]
+
+_billing_job_cache: Optional["BillingJobCache"] = None
+_billing_job_cache_lock = threading.Lock()
+
+def get_billing_job_cache() -> "BillingJobCache":
+    """Cache em disco dos jobs, um por processo (fora do st.cache_resource para ser usado também pelos relatórios em segundo plano)."""
+    from billing_cache import BillingJobCache  # sqlite3 só entra quando o primeiro relatório é pedido
+    global _billing_job_cache
+    with _billing_job_cache_lock:
+        if _billing_job_cache is None: _billing_job_cache = BillingJobCache()
+        return _billing_job_cache
+
+def _fetch_jobs_cached(client: AdminApiClient, scope: str, start_date: str, end_date: str, account_id: Optional[int],
+                       on_progress: Optional[Callable[[int, int], None]] = None, abort_on: Optional[Future] = None) -> List[Dict]:
+    """Detalhe de jobs do período, buscando no gateway só os dias ausentes do cache em disco (ou ainda abertos)."""
+    cache = get_billing_job_cache()
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    missing = cache.missing_days(scope, account_id, start, end)
+    windows = [w for first, last in _contiguous_ranges(missing) for w in split_date_range(first, last)]
+    store = lambda w, jobs: cache.store(scope, account_id, [w[0] + timedelta(days=i) for i in range((w[1] - w[0]).days + 1)], jobs)
+    _fetch_jobs_windowed(client, windows, account_id, on_progress, on_window=store, abort_on=abort_on)
+    return cache.load(scope, account_id, start, end)
+
+def load_billing_report(start_date: str, end_date: str, account_id: Optional[int], api_key: str,
+                        on_progress: Optional[Callable[[int, int], None]] = None,
+                        include_summary: bool = True) -> Tuple[List[Dict], Any]:
+    """Busca o detalhe de jobs (do cache em disco + janelas paralelas, ver _fetch_jobs_cached) e o resumo em paralelo.
+
+    Retorna (jobs, resumo) quando tudo termina e levanta a RequestException assim que o resumo
+    ou alguma janela falhar de vez (sem esperar o restante). Não usa o Streamlit, então também
+    roda nos relatórios em segundo plano (ver report_jobs). Com include_summary=False o resumo
+    do servidor não é pedido e volta como None (o resumo sai dos jobs, ver billing_analytics).
+    """
+    client = get_api_client(api_key)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="billing-summary")
+    summary_future = None
+    if include_summary:
+        summary_future = executor.submit(api_metrics.propagate(lambda: client.get("/billing/report/", params=_billing_params(start_date, end_date, account_id)).json()))
+    try:
+        jobs = _fetch_jobs_cached(client, credential_scope(api_key), start_date, end_date, account_id, on_progress, summary_future)
+        return jobs, summary_future.result() if summary_future else None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,19 @@
+# conftest.py (TESTES: RAIZ DO PROJETO E benchmarks/ NO sys.path, GATEWAY DE MENTIRA COMO FIXTURE)
+
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+from stub_gateway import StubGateway, StubState
+
+ADMIN_KEY = "dev-key"
+
+@pytest.fixture
+def gateway():
+    """Gateway de mentira local (ver benchmarks/stub_gateway.py), com poucos dados e sem latência."""
+    gateway = StubGateway(admin_key=ADMIN_KEY, state=StubState(accounts=3, prompts=3, prompt_chars=20)).start()
+    yield gateway
+    gateway.stop()
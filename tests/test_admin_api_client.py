@@ -0,0 +1,36 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+from conftest import ADMIN_KEY
+from shared_funcs import AdminApiClient
+
+def test_conditional_get_reuses_body_on_304(gateway):
+    client = AdminApiClient(ADMIN_KEY, base_url=gateway.base_url)
+    first = client.get_json("/admin/prompts/", conditional=True)
+    second = client.get_json("/admin/prompts/", conditional=True)
+    assert second is first
+    assert [call[2] for call in gateway.calls] == [200, 304]
+
+def test_conditional_get_refetches_after_etag_changes(gateway):
+    client = AdminApiClient(ADMIN_KEY, base_url=gateway.base_url)
+    first = client.get_json("/admin/prompts/", conditional=True)
+    with gateway.state.lock: gateway.state.prompts[0]["name"] = "Renomeado"
+    second = client.get_json("/admin/prompts/", conditional=True)
+    assert second is not first and second[0]["name"] == "Renomeado"
+    assert [call[2] for call in gateway.calls] == [200, 200]
+
+def test_read_timeout_is_not_retried():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    accepted = []
+    threading.Thread(target=lambda: [accepted.append(server.accept()) for _ in range(8)], daemon=True).start()
+    client = AdminApiClient(ADMIN_KEY, base_url=f"http://127.0.0.1:{server.getsockname()[1]}")
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get("/admin/accounts/", timeout=(1, 0.3))
+    assert time.monotonic() - started < 1
+    assert len(accepted) == 1
+    server.close()
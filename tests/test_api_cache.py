@@ -0,0 +1,53 @@
+import threading
+import time
+from shared_funcs import ApiCache
+
+KEY = ("get_all_prompts", "scope", ())
+
+def test_concurrent_misses_share_one_fetch():
+    cache, release, calls = ApiCache(), threading.Event(), []
+    def fetch():
+        calls.append(1); release.wait(5); return "valor"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(KEY, fetch, ttl=60))) for _ in range(5)]
+    for thread in threads: thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads: thread.join()
+    assert results == ["valor"] * 5 and len(calls) == 1
+    assert cache._inflight == {}
+
+def test_stale_value_is_served_while_revalidating():
+    cache = ApiCache()
+    cache.get_or_load(KEY, lambda: "antigo", ttl=0.01, stale_ttl=60)
+    time.sleep(0.02)
+    assert cache.get_or_load(KEY, lambda: "novo", ttl=0.01, stale_ttl=60) == "antigo"
+    for _ in range(50):
+        if cache.peek(KEY)[1] == "novo": break
+        time.sleep(0.01)
+    assert cache.peek(KEY)[1] == "novo"
+
+def test_read_after_evict_does_not_join_older_refresh():
+    cache, release = ApiCache(), threading.Event()
+    def slow_refresh():
+        release.wait(5); return "anterior à mutação"
+    cache.get_or_load(KEY, lambda: "v0", ttl=0.01, stale_ttl=60)
+    time.sleep(0.02)
+    assert cache.get_or_load(KEY, slow_refresh, ttl=0.01, stale_ttl=60) == "v0"  # Revalidação em segundo plano
+    cache.evict(KEY)
+    assert cache.get_or_load(KEY, lambda: "novo", ttl=60) == "novo"
+    release.set()
+    time.sleep(0.1)
+    assert cache.peek(KEY)[1] == "novo"  # A revalidação antiga não sobrescreve o valor novo
+
+def test_load_started_before_update_is_not_stored():
+    cache, started, release = ApiCache(), threading.Event(), threading.Event()
+    def fetch():
+        started.set(); release.wait(5); return ["antigo"]
+    thread = threading.Thread(target=cache.get_or_load, args=(KEY, fetch, 60))
+    thread.start()
+    started.wait(5)
+    cache.update(KEY[0], KEY[1], lambda args, value: value)
+    release.set()
+    thread.join()
+    assert cache.peek(KEY) is None
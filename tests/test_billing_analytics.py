@@ -0,0 +1,18 @@
+import pandas as pd
+from billing_analytics import _cost_to_fixed_point, COST_SCALE
+
+def test_decimal_strings_convert_exactly():
+    values = pd.Series(["0.00012345", "1", "1.5", ".25", "-0.00000001", "123456.12345678"])
+    assert _cost_to_fixed_point(values).tolist() == [12345, COST_SCALE, 150_000_000, 25_000_000, -1, 12_345_612_345_678]
+
+def test_sum_has_no_float_drift():
+    values = pd.Series(["0.1"] * 10 + ["0.2"] * 10)
+    assert _cost_to_fixed_point(values).sum() == 3 * COST_SCALE
+
+def test_numbers_and_scientific_notation_round_half_up():
+    values = pd.Series(["1e-8", "0.000000015", "2.5E-7", 0.5])
+    assert _cost_to_fixed_point(values).tolist() == [1, 2, 25, 50_000_000]
+
+def test_missing_and_invalid_values_are_zero():
+    values = pd.Series([None, "abc", ""], dtype=object)
+    assert _cost_to_fixed_point(values).tolist() == [0, 0, 0]
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+import pytest
+from billing_cache import BillingJobCache
+
+SCOPE = "scope"
+TODAY = date(2025, 1, 10)
+
+@pytest.fixture
+def cache(tmp_path):
+    return BillingJobCache(str(tmp_path / "billing.sqlite3"))
+
+def _store(cache: BillingJobCache, days, fetched_on: date):
+    cache.store(SCOPE, None, days, [])
+    with cache._connect() as conn:
+        conn.executemany("UPDATE billing_jobs SET fetched_at = ? WHERE day = ?", [(fetched_on.isoformat(), str(d)) for d in days])
+
+def test_all_days_missing_on_empty_cache(cache):
+    start = date(2025, 1, 1)
+    assert cache.missing_days(SCOPE, None, start, start + timedelta(days=4), today=TODAY) == [start + timedelta(days=i) for i in range(5)]
+
+def test_closed_days_are_served_from_disk_and_open_days_refetched(cache):
+    days = [date(2025, 1, d) for d in range(5, 11)]
+    _store(cache, days, fetched_on=TODAY)
+    # 09 (ontem) e 10 (hoje) continuam abertos
+    assert cache.missing_days(SCOPE, None, days[0], days[-1], today=TODAY) == [date(2025, 1, 9), date(2025, 1, 10)]
+
+def test_day_fetched_before_it_closed_is_refetched(cache):
+    _store(cache, [date(2025, 1, 8)], fetched_on=date(2025, 1, 9))  # Buscado quando 08 ainda era "ontem"
+    _store(cache, [date(2025, 1, 7)], fetched_on=date(2025, 1, 9))
+    assert cache.missing_days(SCOPE, None, date(2025, 1, 7), date(2025, 1, 8), today=date(2025, 1, 12)) == [date(2025, 1, 8)]
+
+def test_partitions_are_separated_by_account(cache):
+    day = date(2025, 1, 2)
+    cache.store(SCOPE, 7, [day], [{"job_id": 1, "created_at": "2025-01-02T10:00:00"}])
+    assert cache.missing_days(SCOPE, 7, day, day, today=TODAY) == []
+    assert cache.missing_days(SCOPE, None, day, day, today=TODAY) == [day]
+    assert cache.load(SCOPE, 7, day, day) == [{"job_id": 1, "created_at": "2025-01-02T10:00:00"}]
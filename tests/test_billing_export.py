@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+import billing_export
+from billing_export import write_xlsx, SHEET_NAME
+
+openpyxl = pytest.importorskip("openpyxl")
+
+def _jobs(n: int) -> pd.DataFrame:
+    return pd.DataFrame({'created_at': pd.date_range('2025-01-01', periods=n, freq='h'),
+                         'account_name': [f'Cartório {i}' for i in range(n)], 'job_id': range(n),
+                         'cost_e8': [i * 1_000_000 for i in range(n)]})
+
+def test_rows_past_the_sheet_limit_continue_on_new_sheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(billing_export, 'XLSX_MAX_ROWS', 5)
+    monkeypatch.setattr(billing_export, 'CHUNK_ROWS', 3)
+    path = str(tmp_path / 'relatorio.xlsx')
+    write_xlsx(_jobs(12), path)
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    assert workbook.sheetnames == [SHEET_NAME, f'{SHEET_NAME}_2', f'{SHEET_NAME}_3']
+    job_ids = [row[2] for sheet in workbook for row in list(sheet.iter_rows(values_only=True))[1:]]
+    assert job_ids == list(range(12))
+
+def test_refused_cell_raises(tmp_path):
+    with pytest.raises(RuntimeError, match="CSV ou Parquet"):
+        write_xlsx(pd.DataFrame({'account_name': ['x' * 40_000]}), str(tmp_path / 'relatorio.xlsx'))
@@ -0,0 +1,48 @@
+import time
+import pytest
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("/x", failure_threshold=3, reset_seconds=60)
+    for _ in range(2): breaker.record_failure("HTTP 503")
+    breaker.before_call()
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as rejected: breaker.before_call()
+    assert 59 < rejected.value.retry_in <= 60
+    assert breaker.snapshot()["rejected"] == 1
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("/x", failure_threshold=3)
+    for _ in range(2): breaker.record_failure("timeout")
+    breaker.record_success()
+    for _ in range(2): breaker.record_failure("timeout")
+    assert breaker.state == "closed"
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker("/x", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure("HTTP 500")
+    time.sleep(0.06)
+    breaker.before_call()  # Chamada de teste
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError): breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("/x", failure_threshold=3, reset_seconds=0.05)
+    for _ in range(3): breaker.record_failure("HTTP 500")
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure("HTTP 500")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError): breaker.before_call()
+
+def test_cancelled_probe_frees_the_half_open_slot():
+    breaker = CircuitBreaker("/x", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure("HTTP 500")
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.cancel_probe()
+    breaker.before_call()